@@ -1,61 +1,182 @@
+import asyncio
 import json
+import sys
+from dataclasses import dataclass, field
 from pathlib import Path
-from nonebot import on_message
+from nonebot import get_driver, logger, on_command, on_message
 from nonebot.adapters.onebot.v11 import Bot, GroupMessageEvent, MessageSegment
 from nonebot.adapters.onebot.v11.permission import GROUP
+from nonebot.permission import SUPERUSER
 from nonebot.rule import Rule
 
+current_dir = Path(__file__).parent
+if str(current_dir) not in sys.path:
+    sys.path.append(str(current_dir))
+
+try:
+    from chehui_matcher import AhoCorasick, Normalizer
+except ImportError:
+    try:
+        from .chehui_matcher import AhoCorasick, Normalizer
+    except ImportError:
+        from src.plugins.chehui_matcher import AhoCorasick, Normalizer
+
 # 配置文件路径
 CONFIG_FILE = Path(__file__).parent / "chehui_config.json"
 
+DEFAULT_CONFIG = {
+    "enabled_groups": [],
+    "trigger_words": ["那咋了"]
+}
+
+
+def _read_config() -> dict:
+    """读取配置文件，文件不存在时返回默认配置，解析失败直接抛出"""
+    if not CONFIG_FILE.exists():
+        return dict(DEFAULT_CONFIG)
+    with open(CONFIG_FILE, "r", encoding="utf-8") as f:
+        return json.load(f)
+
+
 def load_config():
     """
-    加载配置文件
-    返回：(enabled_groups, trigger_words)
+    加载配置文件 (启动时使用)，解析失败时退回默认配置
+    返回：配置字典
     """
-    default_config = {
-        "enabled_groups": [],
-        "trigger_words": ["那咋了"]
-    }
-    
-    if not CONFIG_FILE.exists():
-        return default_config
-        
     try:
-        with open(CONFIG_FILE, "r", encoding="utf-8") as f:
-            config = json.load(f)
-            return config
-    except Exception:
-        return default_config
+        return _read_config()
+    except Exception as e:
+        logger.error(f"chehui 配置文件解析失败，使用默认配置: {e}")
+        return dict(DEFAULT_CONFIG)
+
+@dataclass(frozen=True)
+class CompiledConfig:
+    """
+    加载后的配置：规则判断只读这里，不做任何文件 I/O
+    触发词在加载时编译成 Aho-Corasick 自动机，配置了单独词表的群使用 全局词 + 本群词 的自动机
+    """
+    enabled_groups: frozenset
+    matcher: AhoCorasick
+    group_matchers: dict = field(default_factory=dict)
+
+    def matches(self, text: str, group_id: int | None = None) -> bool:
+        return self.group_matchers.get(group_id, self.matcher).search(text)
+
+    @property
+    def word_count(self) -> int:
+        return len(self.matcher) + sum(len(m) - len(self.matcher) for m in self.group_matchers.values())
+
+
+def _parse_group(value) -> int | None:
+    try:
+        return int(value)
+    except (TypeError, ValueError):
+        return None
+
+
+def compile_config(config: dict) -> CompiledConfig:
+    groups = {g for g in map(_parse_group, config.get("enabled_groups", [])) if g is not None}
+
+    # normalize: {"nfkc": false, "casefold": false, "pinyin": false}
+    # 默认全部关闭，与旧版的精确子串匹配一致；放宽匹配需要在配置中显式开启
+    options = config.get("normalize") or {}
+    normalizer = Normalizer(
+        nfkc=bool(options.get("nfkc", False)),
+        casefold=bool(options.get("casefold", False)),
+        pinyin=bool(options.get("pinyin", False)),
+    )
+    words = [w for w in config.get("trigger_words", ["那咋了"]) if w]
+    matcher = AhoCorasick(words, normalizer)
+
+    # group_trigger_words: {"群号": ["本群额外的触发词", ...]}
+    group_matchers = {}
+    for key, extra in (config.get("group_trigger_words") or {}).items():
+        group_id = _parse_group(key)
+        if group_id is None or not extra:
+            continue
+        group_matchers[group_id] = AhoCorasick(words + [w for w in extra if w], normalizer)
+    return CompiledConfig(frozenset(groups), matcher, group_matchers)
+
+
+def _config_mtime() -> float | None:
+    try:
+        return CONFIG_FILE.stat().st_mtime
+    except OSError:
+        return None
+
+
+# 当前生效的配置与对应的文件修改时间，重载时整体替换
+# failed_mtime 记录解析失败的那次修改，避免后台每轮都重复报错
+_state = {"config": compile_config(load_config()), "mtime": _config_mtime(), "failed_mtime": None}
+
+
+def reload_config(force: bool = False) -> bool:
+    """
+    文件修改时间变化 (或 force) 时重新加载并编译配置，返回是否发生了重载
+    文件解析失败时保留当前配置，也不更新 mtime，文件修好后会再次重载
+    """
+    mtime = _config_mtime()
+    if not force and mtime in (_state["mtime"], _state["failed_mtime"]):
+        return False
+    try:
+        compiled = compile_config(_read_config())
+    except Exception as e:
+        _state["failed_mtime"] = mtime
+        logger.error(f"chehui 配置解析失败，继续使用当前配置: {e}")
+        return False
+    _state["config"], _state["mtime"], _state["failed_mtime"] = compiled, mtime, None
+    logger.info(f"chehui 配置已加载：群 {len(compiled.enabled_groups)} 个，触发词 {compiled.word_count} 个")
+    return True
+
+
+driver = get_driver()
+_watch_task: asyncio.Task | None = None
+
+
+async def _watch_config():
+    interval = float(getattr(driver.config, "chehui_reload_interval", 5.0))
+    while True:
+        await asyncio.sleep(interval)
+        try:
+            await asyncio.to_thread(reload_config)
+        except Exception as e:
+            logger.warning(f"chehui 配置重载失败: {e}")
+
+
+@driver.on_startup
+async def _start_watch():
+    global _watch_task
+    if float(getattr(driver.config, "chehui_reload_interval", 5.0)) > 0:
+        _watch_task = asyncio.create_task(_watch_config())
+
+
+@driver.on_shutdown
+async def _stop_watch():
+    if _watch_task is not None:
+        _watch_task.cancel()
+
 
 async def check_rule(bot: Bot, event: GroupMessageEvent) -> bool:
     """
     自定义Rule逻辑：
     1. 检查是否为机器人自己发送的消息 (防止循环触发)
-    2. 读取配置文件
-    3. 检查群号是否在白名单内
-    4. 检查消息内容是否包含触发词
+    2. 检查群号是否在白名单内
+    3. 检查消息内容是否包含触发词
+    配置由后台按文件修改时间重载，这里只读取内存中的编译结果
     """
     # 0. 防止机器人自我触发
     # bot.self_id 是字符串，event.user_id 是整数，需要转换类型比较
     if str(event.user_id) == bot.self_id:
         return False
 
-    config = load_config()
-    enabled_groups = config.get("enabled_groups", [])
-    trigger_words = config.get("trigger_words", ["那咋了"])
+    config = _state["config"]
 
     # 如果群号不在白名单内，直接忽略（返回 False）
-    if event.group_id not in enabled_groups:
+    if event.group_id not in config.enabled_groups:
         return False
-    
+
     # 检查消息纯文本内容是否包含任意触发词
-    msg_text = event.get_plaintext()
-    for word in trigger_words:
-        if word in msg_text:
-            return True
-            
-    return False
+    return config.matches(event.get_plaintext(), event.group_id)
 
 # 注册消息响应器
 # permission=GROUP: 仅允许群聊消息触发
@@ -95,3 +216,18 @@ async def handle_chehui(bot: Bot, event: GroupMessageEvent):
     # 3. @这个人并发送消息
     msg = MessageSegment.at(event.user_id) + " 恭喜您触发禁言彩蛋1分钟！"
     await chehui_plugin.finish(msg)
+
+
+# 手动重载配置
+reload_cmd = on_command("chehui重载", permission=SUPERUSER, priority=5, block=True)
+
+@reload_cmd.handle()
+async def handle_reload():
+    try:
+        reloaded = await asyncio.to_thread(reload_config, True)
+    except Exception as e:
+        await reload_cmd.finish(f"chehui 配置重载失败：{e}")
+    if not reloaded:
+        await reload_cmd.finish("chehui 配置文件解析失败，继续使用当前配置，详见日志")
+    config = _state["config"]
+    await reload_cmd.finish(f"chehui 配置已重载：群 {len(config.enabled_groups)} 个，触发词 {config.word_count} 个")
@@ -0,0 +1,164 @@
+from __future__ import annotations
+
+import sys
+import unicodedata
+from collections import deque
+from functools import lru_cache
+from typing import Iterable
+
+# pypinyin 可选：未安装时谐音匹配不可用，其余归一化照常工作
+try:
+    from pypinyin import lazy_pinyin
+except ImportError:
+    lazy_pinyin = None
+
+if __name__ != "chehui_matcher":
+    sys.modules.setdefault("chehui_matcher", sys.modules[__name__])
+
+# 拼音两侧加分隔符，避免 "傻" 的 sha 与前后字符拼接后误命中其他读音
+_PINYIN_SEP = "\x1f"
+
+
+@lru_cache(maxsize=8192)
+def _char_pinyin(ch: str) -> str:
+    py = lazy_pinyin(ch)
+    if not py or py[0] == ch:
+        return ch
+    return f"{_PINYIN_SEP}{py[0]}{_PINYIN_SEP}"
+
+
+class Normalizer:
+    """
+    触发词与消息使用同一套归一化，之后再做匹配：
+    - nfkc: 全角/半角、兼容字符折叠 (ＳＢ -> SB)
+    - casefold: 大小写折叠
+    - pinyin: 汉字转为无声调拼音，用于匹配谐音 (沙比 -> 傻逼)
+    """
+
+    def __init__(self, nfkc: bool = True, casefold: bool = True, pinyin: bool = False):
+        self.nfkc = nfkc
+        self.casefold = casefold
+        self.pinyin = pinyin and lazy_pinyin is not None
+
+    def __call__(self, text: str) -> str:
+        if self.nfkc:
+            text = unicodedata.normalize("NFKC", text)
+        if self.casefold:
+            text = text.casefold()
+        if self.pinyin:
+            text = "".join(_char_pinyin(ch) if ch >= "㐀" else ch for ch in text)
+        return text
+
+    def __repr__(self) -> str:
+        return f"Normalizer(nfkc={self.nfkc}, casefold={self.casefold}, pinyin={self.pinyin})"
+
+
+class AhoCorasick:
+    """
+    多模式串匹配自动机：构建一次，之后每条消息只需扫描一遍，耗时与触发词数量无关
+    节点用 dict 保存转移，失配时沿 fail 链回退
+    """
+
+    def __init__(self, words: Iterable[str], normalizer: Normalizer | None = None):
+        self.normalizer = normalizer or Normalizer(nfkc=False, casefold=False)
+        self.words: list[str] = []
+        self._goto: list[dict[str, int]] = [{}]
+        self._fail: list[int] = [0]
+        # 以该节点结尾的触发词下标 (含 fail 链上的)
+        self._out: list[tuple[int, ...]] = [()]
+        for word in dict.fromkeys(words):
+            self._add(word)
+        self._build()
+
+    def __len__(self) -> int:
+        return len(self.words)
+
+    def _add(self, word: str):
+        key = self.normalizer(word)
+        if not key:
+            return
+        node = 0
+        for ch in key:
+            nxt = self._goto[node].get(ch)
+            if nxt is None:
+                nxt = len(self._goto)
+                self._goto[node][ch] = nxt
+                self._goto.append({})
+                self._fail.append(0)
+                self._out.append(())
+            node = nxt
+        self._out[node] += (len(self.words),)
+        self.words.append(word)
+
+    def _build(self):
+        queue = deque(self._goto[0].values())
+        while queue:
+            node = queue.popleft()
+            for ch, nxt in self._goto[node].items():
+                queue.append(nxt)
+                f = self._fail[node]
+                while f and ch not in self._goto[f]:
+                    f = self._fail[f]
+                self._fail[nxt] = self._goto[f].get(ch, 0)
+                self._out[nxt] += self._out[self._fail[nxt]]
+
+    def _scan(self, text: str):
+        goto, fail, out = self._goto, self._fail, self._out
+        node = 0
+        for ch in self.normalizer(text):
+            while node and ch not in goto[node]:
+                node = fail[node]
+            node = goto[node].get(ch, 0)
+            if out[node]:
+                yield out[node]
+
+    def search(self, text: str) -> bool:
+        """是否命中任意触发词，命中即返回"""
+        for _ in self._scan(text):
+            return True
+        return False
+
+    def find_all(self, text: str) -> list[str]:
+        """命中的全部触发词 (去重，按首次命中顺序)"""
+        found: dict[int, None] = {}
+        for indexes in self._scan(text):
+            found.update(dict.fromkeys(indexes))
+        return [self.words[i] for i in found]
+
+
+def _benchmark():
+    """对比逐词 `in` 与自动机在不同触发词数量下的匹配吞吐"""
+    import random
+    import time
+
+    rng = random.Random(0)
+    han = [chr(c) for c in range(0x4E00, 0x4E00 + 3000)]
+
+    def rand_text(n: int) -> str:
+        return "".join(rng.choice(han) for _ in range(n))
+
+    messages = [rand_text(rng.randint(5, 80)) for _ in range(2000)]
+    normalizer = Normalizer()
+    print(f"{len(messages)} 条消息，平均 {sum(map(len, messages)) / len(messages):.0f} 字，{normalizer}")
+    print(f"{'触发词数':>8} {'构建(ms)':>10} {'逐词 in (条/s)':>16} {'自动机 (条/s)':>16}")
+    for count in (10, 100, 1000, 5000):
+        words = [rand_text(rng.randint(2, 4)) for _ in range(count)]
+        norm_words = [normalizer(w) for w in words]
+        start = time.perf_counter()
+        ac = AhoCorasick(words, normalizer)
+        build_ms = (time.perf_counter() - start) * 1000
+
+        start = time.perf_counter()
+        naive = [any(w in t for w in norm_words) for t in map(normalizer, messages)]
+        naive_rate = len(messages) / (time.perf_counter() - start)
+
+        start = time.perf_counter()
+        fast = [ac.search(m) for m in messages]
+        fast_rate = len(messages) / (time.perf_counter() - start)
+
+        assert naive == fast
+        print(f"{count:>8} {build_ms:>10.1f} {naive_rate:>16,.0f} {fast_rate:>16,.0f}")
+
+
+if __name__ == "__main__":
+    _benchmark()
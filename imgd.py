@@ -1,10 +1,42 @@
-from nonebot import on_command, on_message, logger
-from nonebot.rule import to_me
+from nonebot import on_command, on_message, logger, get_driver
+from nonebot.rule import Rule, to_me
 from nonebot.adapters.onebot.v11 import Bot, MessageEvent, Message, MessageSegment
 from nonebot.permission import SUPERUSER
+import asyncio
+import hashlib
+import multiprocessing
 import os
+import sys
+import time
+import uuid
 import httpx
-from datetime import datetime
+from collections import deque
+from concurrent.futures import Executor, ProcessPoolExecutor, ThreadPoolExecutor
+from dataclasses import dataclass
+from pathlib import Path
+from urllib.parse import parse_qsl, urlencode, urlsplit, urlunsplit
+
+current_dir = Path(__file__).parent
+if str(current_dir) not in sys.path:
+    sys.path.append(str(current_dir))
+
+try:
+    from ww_db_helper import db
+except ImportError:
+    try:
+        from .ww_db_helper import db
+    except ImportError:
+        from src.plugins.ww_db_helper import db
+
+try:
+    from imgd_pipeline import process_image
+except ImportError:
+    try:
+        from .imgd_pipeline import process_image
+    except ImportError:
+        from src.plugins.imgd_pipeline import process_image
+
+driver = get_driver()
 
 # 全局变量
 DOWNLOADER_STATE = {
@@ -16,6 +48,590 @@ if not os.path.exists("img"):
     os.makedirs("img")
     logger.info("Created img directory")
 
+# 下载中的临时文件目录，与存储目录在同一文件系统上才能原子重命名
+TMP_DIR = os.path.join("img", ".tmp")
+os.makedirs(TMP_DIR, exist_ok=True)
+THUMB_DIR = os.path.join("img", "thumbs")
+
+_EXTENSIONS = {"image/jpeg": "jpg", "image/png": "png", "image/gif": "gif", "image/webp": "webp", "image/bmp": "bmp"}
+
+
+# 下载量统计：成功写入的文件数/字节数/耗时，以及被中止的下载数
+download_stats = {
+    "files": 0,
+    "bytes": 0,
+    "seconds": 0.0,
+    "rejected_type": 0,
+    "rejected_size": 0,
+    "known_url": 0,
+    "duplicate": 0,
+    "processed": 0,
+    "process_failed": 0,
+}
+
+
+def _config(name: str, default):
+    return getattr(driver.config, name, default)
+
+
+@dataclass
+class DownloadJob:
+    bot: Bot
+    user_id: int
+    url: str
+
+
+class DownloadQueue:
+    """
+    有界下载队列：消息处理器只负责入队，固定数量的 worker 共用一个连接池下载
+    - 每个域名同时下载数受 per_host 限制，避免单个图床拖住全部 worker；
+      取到已满域名的任务时先暂存，由正在下载该域名的 worker 完成后接着处理，当前 worker 继续处理其他域名
+    - 队列满时按 overflow 策略处理：drop_new 丢弃新任务，drop_oldest 丢弃最早的任务
+    """
+
+    def __init__(self, maxsize: int = 200, workers: int = 4, per_host: int = 2, overflow: str = "drop_new"):
+        self.maxsize = max(1, maxsize)
+        self.worker_count = max(1, workers)
+        self.per_host = max(1, per_host)
+        self.overflow = overflow if overflow in ("drop_new", "drop_oldest") else "drop_new"
+        self._queue: asyncio.Queue[DownloadJob] | None = None
+        self._workers: list[asyncio.Task] = []
+        self._active: dict[str, int] = {}
+        self._deferred: dict[str, deque[DownloadJob]] = {}
+        self.client: httpx.AsyncClient | None = None
+        self.stats = {"enqueued": 0, "dropped": 0, "done": 0, "failed": 0}
+
+    def start(self):
+        if self._workers:
+            return
+        self._queue = asyncio.Queue(self.maxsize)
+        self.client = httpx.AsyncClient(
+            timeout=httpx.Timeout(30.0, connect=10.0),
+            limits=httpx.Limits(max_connections=self.worker_count * 2, max_keepalive_connections=self.worker_count),
+            follow_redirects=True,
+        )
+        self._workers = [asyncio.create_task(self._worker(i)) for i in range(self.worker_count)]
+        logger.info(f"imgd 下载队列已启动 workers={self.worker_count} maxsize={self.maxsize} overflow={self.overflow}")
+
+    async def stop(self):
+        for task in self._workers:
+            task.cancel()
+        await asyncio.gather(*self._workers, return_exceptions=True)
+        self._workers = []
+        self._active.clear()
+        self._deferred.clear()
+        if self.client is not None:
+            await self.client.aclose()
+            self.client = None
+
+    def submit(self, job: DownloadJob) -> bool:
+        if self._queue is None:
+            self.start()
+        if self._queue.full() or self.qsize() >= self.maxsize:
+            if self.overflow == "drop_oldest":
+                dropped = self._drop_oldest()
+                if dropped is not None:
+                    self.stats["dropped"] += 1
+                    logger.warning(f"imgd 队列已满，丢弃最早的任务: {dropped.url}")
+            else:
+                self.stats["dropped"] += 1
+                logger.warning(f"imgd 队列已满，丢弃新任务: {job.url}")
+                return False
+        self._queue.put_nowait(job)
+        self.stats["enqueued"] += 1
+        return True
+
+    def qsize(self) -> int:
+        """排队中的任务数，包含因域名已满而暂存的任务"""
+        queued = self._queue.qsize() if self._queue is not None else 0
+        return queued + sum(len(d) for d in self._deferred.values())
+
+    def _drop_oldest(self) -> DownloadJob | None:
+        try:
+            job = self._queue.get_nowait()
+            self._queue.task_done()
+            return job
+        except asyncio.QueueEmpty:
+            pass
+        # 队列为空说明积压都在暂存区，从最长的那个域名里丢
+        if not self._deferred:
+            return None
+        host = max(self._deferred, key=lambda h: len(self._deferred[h]))
+        pending = self._deferred[host]
+        job = pending.popleft()
+        if not pending:
+            del self._deferred[host]
+        return job
+
+    async def _run(self, index: int, job: DownloadJob):
+        try:
+            ok = await _download(self.client, job)
+            self.stats["done" if ok else "failed"] += 1
+        except Exception as e:
+            self.stats["failed"] += 1
+            logger.error(f"imgd worker-{index} 处理任务出错: {e}")
+
+    async def _worker(self, index: int):
+        while True:
+            job = await self._queue.get()
+            self._queue.task_done()
+            host = urlsplit(job.url).hostname or ""
+            if self._active.get(host, 0) >= self.per_host:
+                # 该域名已达上限：暂存，不占用当前 worker
+                self._deferred.setdefault(host, deque()).append(job)
+                continue
+            self._active[host] = self._active.get(host, 0) + 1
+            try:
+                while job is not None:
+                    await self._run(index, job)
+                    pending = self._deferred.get(host)
+                    job = pending.popleft() if pending else None
+                    if pending is not None and not pending:
+                        del self._deferred[host]
+            finally:
+                self._active[host] -= 1
+                if not self._active[host]:
+                    del self._active[host]
+
+
+download_queue = DownloadQueue(
+    maxsize=int(_config("imgd_queue_size", 200)),
+    workers=int(_config("imgd_workers", 4)),
+    per_host=int(_config("imgd_per_host", 2)),
+    overflow=str(_config("imgd_overflow", "drop_new")),
+)
+
+
+class Notifier:
+    """
+    下载结果通知：
+    - batch：按接收者缓存，达到 batch_size 条或等待 window 秒后合并成一条汇总私聊
+    - each：每张图片单独发送 (旧行为)
+    - off：不发送
+    """
+
+    _LABELS = {"saved": "已保存", "duplicate": "已存在", "failed": "失败"}
+
+    def __init__(self, mode: str = "batch", window: float = 10.0, batch_size: int = 20):
+        self.mode = mode if mode in ("batch", "each", "off") else "batch"
+        self.window = max(0.0, window)
+        self.batch_size = max(1, batch_size)
+        self._pending: dict[tuple[str, int], list[tuple[str, str]]] = {}
+        self._bots: dict[tuple[str, int], Bot] = {}
+        self._timers: dict[tuple[str, int], asyncio.Task] = {}
+        self.stats = {"events": 0, "sent": 0}
+
+    async def _send(self, bot: Bot, user_id: int, message: str):
+        try:
+            await bot.send_private_msg(user_id=user_id, message=message)
+            self.stats["sent"] += 1
+        except Exception as e:
+            logger.warning(f"imgd 通知发送失败 user={user_id} err={e}")
+
+    async def notify(self, job: DownloadJob, kind: str, text: str):
+        self.stats["events"] += 1
+        if self.mode == "off":
+            return
+        if self.mode == "each":
+            await self._send(job.bot, job.user_id, text)
+            return
+        key = (job.bot.self_id, job.user_id)
+        self._bots[key] = job.bot
+        pending = self._pending.setdefault(key, [])
+        pending.append((kind, text))
+        if len(pending) >= self.batch_size:
+            await self.flush(key)
+        elif key not in self._timers:
+            self._timers[key] = asyncio.create_task(self._flush_later(key))
+
+    async def _flush_later(self, key: tuple[str, int]):
+        await asyncio.sleep(self.window)
+        self._timers.pop(key, None)
+        await self.flush(key)
+
+    async def flush(self, key: tuple[str, int]):
+        timer = self._timers.pop(key, None)
+        if timer is not None and timer is not asyncio.current_task():
+            timer.cancel()
+        items = self._pending.pop(key, [])
+        bot = self._bots.pop(key, None)
+        if not items or bot is None:
+            return
+        if len(items) == 1:
+            await self._send(bot, key[1], items[0][1])
+            return
+        counts = {k: sum(1 for kind, _ in items if kind == k) for k in self._LABELS}
+        lines = ["imgd：" + " ".join(f"{label} {counts[k]} 张" for k, label in self._LABELS.items() if counts[k])]
+        errors = [text for kind, text in items if kind == "failed"]
+        lines.extend(errors[:5])
+        if len(errors) > 5:
+            lines.append(f"...另有 {len(errors) - 5} 条错误")
+        await self._send(bot, key[1], "\n".join(lines))
+
+    async def flush_all(self):
+        for key in list(self._pending):
+            await self.flush(key)
+
+
+notifier = Notifier(
+    mode=str(_config("imgd_notify_mode", "batch")),
+    window=float(_config("imgd_notify_window", 10.0)),
+    batch_size=int(_config("imgd_notify_batch", 20)),
+)
+
+
+class ImagePipeline:
+    """
+    下载后的后台处理：识别真实格式并修正扩展名、生成缩略图、记录尺寸
+    Pillow 的解码与缩放默认在线程池中执行 (Pillow 处理期间会释放 GIL)，事件循环只负责调度和写索引
+    mode="process" 改用 spawn 进程池：子进程会重新导入启动脚本，
+    bot.py 中的 nonebot.init()/nonebot.run() 必须放在 if __name__ == "__main__" 下，否则每个子进程都会再启动一遍 Bot
+    imgd_blob.processed：0 待处理，1 已完成，-1 失败次数达到上限；失败未达上限的图片在下次启动时重试
+    """
+
+    def __init__(self, mode: str = "thread", workers: int = 1, thumb_size: int = 256, max_attempts: int = 3):
+        self.mode = mode if mode in ("thread", "process") else "thread"
+        self.workers = max(1, workers)
+        self.thumb_size = thumb_size
+        self.max_attempts = max(1, max_attempts)
+        self._queue: asyncio.Queue[str] = asyncio.Queue()
+        self._tasks: list[asyncio.Task] = []
+        self._executor: Executor | None = None
+
+    def start(self):
+        if self._tasks:
+            return
+        if self.mode == "process":
+            self._executor = ProcessPoolExecutor(
+                max_workers=self.workers,
+                mp_context=multiprocessing.get_context("spawn"),
+            )
+        else:
+            self._executor = ThreadPoolExecutor(max_workers=self.workers, thread_name_prefix="imgd_pipeline")
+        self._tasks = [asyncio.create_task(self._consume()) for _ in range(self.workers)]
+        # 积压的待处理图片在后台分页放入队列，不阻塞启动
+        self._tasks.append(asyncio.create_task(self._resume_and_log()))
+
+    async def stop(self):
+        for task in self._tasks:
+            task.cancel()
+        await asyncio.gather(*self._tasks, return_exceptions=True)
+        self._tasks = []
+        if self._executor is not None:
+            self._executor.shutdown(wait=False, cancel_futures=True)
+            self._executor = None
+
+    @property
+    def running(self) -> bool:
+        return bool(self._tasks)
+
+    def submit(self, digest: str):
+        self._queue.put_nowait(digest)
+
+    def backlog(self) -> int:
+        return self._queue.qsize()
+
+    async def resume(self, page_size: int = 500) -> int:
+        """按 first_seen 分页取出待处理的图片放入队列，队列积压过多时先等处理掉一部分"""
+        # 旧版本标记为失败 (-1) 但未达到重试上限的，重新放回待处理
+        await db.execute_update(
+            "UPDATE imgd_blob SET processed = 0 WHERE processed = -1 AND attempts < ?", (self.max_attempts,)
+        )
+        total = 0
+        after = None
+        while True:
+            rows, after = await db.fetch_page(
+                "imgd_blob", ("first_seen", "sha256"), "sha256, first_seen",
+                after=after, limit=page_size, where="processed = 0",
+            )
+            for row in rows:
+                self.submit(row["sha256"])
+            total += len(rows)
+            if after is None:
+                return total
+            while self.backlog() > page_size:
+                await asyncio.sleep(1)
+
+    async def _resume_and_log(self):
+        try:
+            backlog = await self.resume()
+        except Exception as e:
+            logger.error(f"imgd 读取积压图片失败: {e}")
+            return
+        if backlog:
+            logger.info(f"imgd 继续处理积压图片 {backlog} 张")
+
+    async def _consume(self):
+        loop = asyncio.get_running_loop()
+        while True:
+            digest = await self._queue.get()
+            try:
+                row = await db.fetch_one(
+                    "SELECT path, processed, attempts FROM imgd_blob WHERE sha256 = ?", (digest,)
+                )
+                if not row or row["processed"] != 0:
+                    continue
+                try:
+                    info = await loop.run_in_executor(
+                        self._executor, process_image, row["path"], THUMB_DIR, self.thumb_size
+                    )
+                except Exception as e:
+                    download_stats["process_failed"] += 1
+                    attempts = (row["attempts"] or 0) + 1
+                    # 未达上限时保持待处理状态，下次启动时重试
+                    processed = -1 if attempts >= self.max_attempts else 0
+                    logger.warning(f"imgd 图片处理失败 ({attempts}/{self.max_attempts}) {row['path']}: {e}")
+                    await db.execute_update(
+                        "UPDATE imgd_blob SET processed = ?, attempts = ? WHERE sha256 = ?",
+                        (processed, attempts, digest),
+                    )
+                    continue
+                await db.execute_update(
+                    "UPDATE imgd_blob SET path = ?, format = ?, width = ?, height = ?, thumb_path = ?, processed = 1 "
+                    "WHERE sha256 = ?",
+                    (info["path"], info["format"], info["width"], info["height"], info["thumb_path"], digest),
+                )
+                download_stats["processed"] += 1
+            except Exception as e:
+                logger.error(f"imgd 处理队列出错: {e}")
+            finally:
+                self._queue.task_done()
+
+
+pipeline = ImagePipeline(
+    mode=_config("imgd_pipeline_executor", "thread"),
+    workers=int(_config("imgd_pipeline_workers", 1)),
+    thumb_size=int(_config("imgd_thumb_size", 256)),
+    max_attempts=int(_config("imgd_pipeline_attempts", 3)),
+)
+
+
+@driver.on_startup
+async def _init_store():
+    # 索引：url -> sha256 -> 文件，同一张图无论被发多少次只存一份
+    await db.create_table("""
+        CREATE TABLE IF NOT EXISTS imgd_blob (
+            sha256 TEXT PRIMARY KEY,
+            path TEXT NOT NULL,
+            size INTEGER NOT NULL,
+            format TEXT,
+            first_seen TIMESTAMP DEFAULT CURRENT_TIMESTAMP
+        )
+    """)
+    await db.create_table("""
+        CREATE TABLE IF NOT EXISTS imgd_url (
+            url TEXT PRIMARY KEY,
+            sha256 TEXT NOT NULL,
+            first_seen TIMESTAMP DEFAULT CURRENT_TIMESTAMP
+        )
+    """)
+    await db.create_table("CREATE INDEX IF NOT EXISTS idx_imgd_url_sha256 ON imgd_url (sha256)")
+    # 后台处理结果列，旧表补列
+    columns = {c.get("name") for c in await db.fetch_all("PRAGMA table_info(imgd_blob)")}
+    for name, ddl in (
+        ("width", "INTEGER"),
+        ("height", "INTEGER"),
+        ("thumb_path", "TEXT"),
+        ("processed", "INTEGER NOT NULL DEFAULT 0"),
+        ("attempts", "INTEGER NOT NULL DEFAULT 0"),
+    ):
+        if name not in columns:
+            await db.execute_update(f"ALTER TABLE imgd_blob ADD COLUMN {name} {ddl}")
+    await db.create_table("CREATE INDEX IF NOT EXISTS idx_imgd_blob_processed ON imgd_blob (processed)")
+    # 上次退出时未完成的下载
+    stale = await asyncio.to_thread(lambda: [p for p in Path(TMP_DIR).glob("*.part")])
+    for p in stale:
+        await asyncio.to_thread(p.unlink, missing_ok=True)
+
+    if _config("imgd_pipeline_enabled", True):
+        pipeline.start()
+
+
+@driver.on_shutdown
+async def _stop_queue():
+    await download_queue.stop()
+    await notifier.flush_all()
+    await pipeline.stop()
+
+
+class DownloadRejected(Exception):
+    """下载被主动中止 (非图片类型、超出大小限制)"""
+
+
+class _ChunkWriter:
+    """
+    把下载的数据块写入临时文件并同时计算 sha256：攒够 flush_bytes 再交给线程写盘，不阻塞事件循环
+    下载完成后由调用方决定 commit 到内容地址路径，或在内容重复时 discard；出错时自动删除临时文件
+    """
+
+    def __init__(self, tmp_dir: str, flush_bytes: int = 256 * 1024):
+        self.tmp_path = os.path.join(tmp_dir, f"{uuid.uuid4().hex}.part")
+        self.flush_bytes = flush_bytes
+        self._file = None
+        self._buffer = bytearray()
+        self._hash = hashlib.sha256()
+        self.written = 0
+        self.committed = False
+
+    async def __aenter__(self):
+        self._file = await asyncio.to_thread(open, self.tmp_path, "wb")
+        return self
+
+    async def write(self, chunk: bytes):
+        self._buffer += chunk
+        if len(self._buffer) >= self.flush_bytes:
+            await self._flush()
+
+    def _write_sync(self, data: bytes):
+        self._file.write(data)
+        self._hash.update(data)
+
+    async def _flush(self):
+        if self._buffer:
+            data = bytes(self._buffer)
+            self._buffer.clear()
+            await asyncio.to_thread(self._write_sync, data)
+            self.written += len(data)
+
+    async def __aexit__(self, exc_type, exc, tb):
+        failed = exc_type is not None
+        try:
+            if not failed:
+                await self._flush()
+        except BaseException:
+            failed = True
+            raise
+        finally:
+            await asyncio.to_thread(self._file.close)
+            if failed:
+                await self.discard()
+        return False
+
+    def hexdigest(self) -> str:
+        return self._hash.hexdigest()
+
+    async def commit(self, path: str):
+        def _move():
+            os.makedirs(os.path.dirname(path), exist_ok=True)
+            os.replace(self.tmp_path, path)
+        await asyncio.to_thread(_move)
+        self.committed = True
+
+    async def discard(self):
+        await asyncio.to_thread(_remove_quietly, self.tmp_path)
+
+
+def _remove_quietly(path: str):
+    try:
+        os.remove(path)
+    except FileNotFoundError:
+        pass
+
+
+def _is_image_type(content_type: str) -> bool:
+    # 部分图床不返回 Content-Type 或返回通用二进制类型，这两种情况放行
+    ct = content_type.split(";")[0].strip().lower()
+    return not ct or ct.startswith("image/") or ct == "application/octet-stream"
+
+
+def _normalize_url(url: str) -> str:
+    """去掉每次下发都会变化的鉴权参数 (如 QQ 图床的 rkey)，让同一张图的地址可以匹配"""
+    ignore = set(_config("imgd_url_ignore_params", ["rkey"]))
+    parts = urlsplit(url)
+    query = [(k, v) for k, v in parse_qsl(parts.query, keep_blank_values=True) if k not in ignore]
+    return urlunsplit((parts.scheme, parts.netloc, parts.path, urlencode(query), ""))
+
+
+def _declared_format(content_type: str) -> str | None:
+    # 响应头声明的格式 (如 image/png -> png)，后台处理后会替换为 Pillow 识别的真实格式
+    ct = content_type.split(";")[0].strip().lower()
+    return ct.split("/", 1)[1] if ct.startswith("image/") else None
+
+
+def _blob_path(digest: str, content_type: str) -> str:
+    ext = _EXTENSIONS.get(content_type.split(";")[0].strip().lower(), "jpg")
+    return os.path.join("img", digest[:2], digest[2:4], f"{digest}.{ext}")
+
+
+async def _download(client: httpx.AsyncClient, job: DownloadJob) -> bool:
+    url = job.url
+    max_bytes = int(float(_config("imgd_max_mb", 20)) * 1024 * 1024)
+    writer: _ChunkWriter | None = None
+    try:
+        # 已下载过的地址直接跳过，不发请求
+        url_key = _normalize_url(url)
+        if await db.fetch_one("SELECT sha256 FROM imgd_url WHERE url = ?", (url_key,)):
+            download_stats["known_url"] += 1
+            logger.info(f"imgd 跳过已下载的地址: {url_key}")
+            return True
+
+        # 流式下载：分块写入临时文件并计算 sha256，完成后按内容地址存放
+        started = time.perf_counter()
+        async with client.stream("GET", url) as response:
+            if response.status_code != 200:
+                error_msg = f"下载失败: HTTP {response.status_code}"
+                logger.error(error_msg)
+                await notifier.notify(job, "failed", error_msg)
+                return False
+            content_type = response.headers.get("Content-Type", "")
+            if not _is_image_type(content_type):
+                download_stats["rejected_type"] += 1
+                raise DownloadRejected(f"不是图片: {content_type}")
+            length = response.headers.get("Content-Length")
+            if length and length.isdigit() and int(length) > max_bytes:
+                download_stats["rejected_size"] += 1
+                raise DownloadRejected(f"文件过大: {int(length)} bytes")
+            async with _ChunkWriter(TMP_DIR) as writer:
+                received = 0
+                async for chunk in response.aiter_bytes():
+                    received += len(chunk)
+                    if received > max_bytes:
+                        download_stats["rejected_size"] += 1
+                        raise DownloadRejected(f"文件超过 {max_bytes} bytes")
+                    await writer.write(chunk)
+        download_stats["seconds"] += time.perf_counter() - started
+
+        digest = writer.hexdigest()
+        existing = await db.fetch_one("SELECT path FROM imgd_blob WHERE sha256 = ?", (digest,))
+        if existing:
+            # 内容重复：丢弃临时文件，只记录地址映射
+            await writer.discard()
+            filename = existing["path"]
+            download_stats["duplicate"] += 1
+        else:
+            filename = _blob_path(digest, content_type)
+            await writer.commit(filename)
+            await db.execute_update(
+                "INSERT OR IGNORE INTO imgd_blob (sha256, path, size, format) VALUES (?, ?, ?, ?)",
+                (digest, filename, writer.written, _declared_format(content_type)),
+            )
+            download_stats["files"] += 1
+            download_stats["bytes"] += writer.written
+            if pipeline.running:
+                pipeline.submit(digest)
+        await db.execute_update("INSERT OR IGNORE INTO imgd_url (url, sha256) VALUES (?, ?)", (url_key, digest))
+
+        if existing:
+            logger.info(f"imgd 内容重复，复用已有文件: {filename}")
+        else:
+            logger.info(f"Successfully saved image: {filename}")
+        if existing:
+            await notifier.notify(job, "duplicate", f"图片已存在: {filename}")
+        else:
+            await notifier.notify(job, "saved", f"图片已保存: {filename}")
+        return True
+
+    except Exception as e:
+        error_msg = f"下载出错: {str(e)}"
+        logger.error(error_msg)
+        await notifier.notify(job, "failed", error_msg)
+        return False
+    finally:
+        # 下载完成后的校验、写索引或 commit 出错时，临时文件不能留下
+        if writer is not None and not writer.committed:
+            await writer.discard()
+
+
 # 命令处理器
 start_cmd = on_command("imgd start", permission=SUPERUSER, priority=1, block=True)
 stop_cmd = on_command("imgd stop", permission=SUPERUSER, priority=1, block=True)
@@ -27,6 +643,7 @@ async def handle_start(bot: Bot, event: MessageEvent):
         await start_cmd.finish("图片下载器已经在运行中！")
     else:
         DOWNLOADER_STATE["running"] = True
+        download_queue.start()
         logger.info("Image downloader started")
         await bot.send_private_msg(user_id=event.user_id, message="图片下载器已启动！")
 
@@ -36,62 +653,47 @@ async def handle_stop(bot: Bot, event: MessageEvent):
     if not DOWNLOADER_STATE["running"]:
         await stop_cmd.finish("图片下载器已经是关闭状态！")
     else:
+        # 只停止接收新图片，队列中已有的任务继续下载完
         DOWNLOADER_STATE["running"] = False
         logger.info("Image downloader stopped")
         await bot.send_private_msg(user_id=event.user_id, message="图片下载器已关闭！")
 
+stats_cmd = on_command("imgd stats", permission=SUPERUSER, priority=1, block=True)
+
+@stats_cmd.handle()
+async def handle_stats():
+    q = download_queue.stats
+    d = download_stats
+    throughput = d["bytes"] / d["seconds"] / 1024 if d["seconds"] > 0 else 0.0
+    await stats_cmd.finish(
+        "📥 imgd 统计\n"
+        f"状态：{'运行中' if DOWNLOADER_STATE['running'] else '已关闭'} 队列 {download_queue.qsize()}/{download_queue.maxsize}\n"
+        f"任务：入队 {q['enqueued']} 完成 {q['done']} 失败 {q['failed']} 丢弃 {q['dropped']}\n"
+        f"写入：{d['files']} 个文件 {d['bytes'] / 1024 / 1024:.2f}MB 平均 {throughput:.1f}KB/s\n"
+        f"去重：已知地址 {d['known_url']} 重复内容 {d['duplicate']}\n"
+        f"中止：非图片 {d['rejected_type']} 超出大小 {d['rejected_size']}\n"
+        f"后台处理：完成 {d['processed']} 失败 {d['process_failed']} 待处理 {pipeline.backlog()}"
+    )
+
+async def _image_rule(event: MessageEvent) -> bool:
+    """下载器关闭时不做任何解析；开启后只看消息段类型，不提取纯文本"""
+    if not DOWNLOADER_STATE["running"]:
+        return False
+    return any(seg.type == "image" for seg in event.get_message())
+
 # 消息处理器
-msg_handler = on_message(priority=5, block=False)
+msg_handler = on_message(rule=Rule(_image_rule), priority=5, block=False)
 
 @msg_handler.handle()
 async def handle_message(bot: Bot, event: MessageEvent):
-    if not DOWNLOADER_STATE["running"]:
-        return
-
-    logger.info(f"Processing message from {event.get_user_id()}")
-    message = event.get_message()
-    
-    # 处理消息中的每个段落
-    for seg in message:
+    # 只负责把图片地址放入下载队列，下载由后台 worker 完成
+    for seg in event.get_message():
         if seg.type == "image":
             url = seg.data.get("url", "")
             if not url:
                 continue
-                
             logger.info(f"Found image URL: {url}")
-            
-            try:
-                # 生成文件名
-                timestamp = datetime.now().strftime("%Y%m%d_%H%M%S")
-                filename = f"{timestamp}_{hash(url) % 10000}.jpg"
-                filepath = os.path.join("img", filename)
-                
-                # 下载图片
-                async with httpx.AsyncClient(timeout=30.0) as client:
-                    response = await client.get(url)
-                    if response.status_code == 200:
-                        with open(filepath, "wb") as f:
-                            f.write(response.content)
-                        logger.info(f"Successfully saved image: {filename}")
-                        await bot.send_private_msg(
-                            user_id=event.user_id,
-                            message=f"图片已保存: {filename}"
-                        )
-                    else:
-                        error_msg = f"下载失败: HTTP {response.status_code}"
-                        logger.error(error_msg)
-                        await bot.send_private_msg(
-                            user_id=event.user_id,
-                            message=error_msg
-                        )
-            
-            except Exception as e:
-                error_msg = f"下载出错: {str(e)}"
-                logger.error(error_msg)
-                await bot.send_private_msg(
-                    user_id=event.user_id,
-                    message=error_msg
-                )
+            download_queue.submit(DownloadJob(bot, event.user_id, url))
 
 # 启动时的日志
-logger.info("Image downloader plugin loaded")
\ No newline at end of file
+logger.info("Image downloader plugin loaded")
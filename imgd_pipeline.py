@@ -0,0 +1,60 @@
+from __future__ import annotations
+
+import os
+import sys
+
+from PIL import Image, features
+
+if __name__ != "imgd_pipeline":
+    sys.modules.setdefault("imgd_pipeline", sys.modules[__name__])
+
+# Pillow 识别出的格式 -> 文件扩展名
+FORMAT_EXTENSIONS = {"JPEG": "jpg", "PNG": "png", "GIF": "gif", "WEBP": "webp", "BMP": "bmp", "MPO": "jpg"}
+
+
+def process_image(path: str, thumb_root: str, thumb_size: int = 256) -> dict:
+    """
+    在进程池中运行：识别真实格式并修正扩展名、生成缩略图、读取尺寸
+    只依赖 Pillow，不导入 NoneBot，spawn 启动的子进程可以直接导入
+    :return: {"path", "format", "width", "height", "thumb_path"}
+    """
+    with Image.open(path) as img:
+        fmt = img.format or ""
+        width, height = img.size
+        # 动图只取第一帧做缩略图
+        img.seek(0)
+        thumb = img.convert("RGBA" if img.mode in ("RGBA", "LA", "P") else "RGB")
+    thumb.thumbnail((thumb_size, thumb_size), Image.Resampling.LANCZOS)
+
+    base, ext = os.path.splitext(path)
+    real_ext = FORMAT_EXTENSIONS.get(fmt, ext.lstrip(".") or "bin")
+    new_path = f"{base}.{real_ext}"
+
+    # 先写缩略图，最后再改原图扩展名：缩略图失败时原图路径不变，索引里的 path 仍然有效
+    digest = os.path.basename(base)
+    thumb_format = "WEBP" if features.check("webp") else "JPEG"
+    thumb_path = os.path.join(thumb_root, digest[:2], f"{digest}.{thumb_format.lower()}")
+    os.makedirs(os.path.dirname(thumb_path), exist_ok=True)
+    tmp = f"{thumb_path}.{os.getpid()}.tmp"
+    if thumb_format == "JPEG":
+        thumb = thumb.convert("RGB")
+    try:
+        thumb.save(tmp, format=thumb_format, quality=80)
+        os.replace(tmp, thumb_path)
+    except BaseException:
+        try:
+            os.remove(tmp)
+        except OSError:
+            pass
+        raise
+
+    if new_path != path:
+        os.replace(path, new_path)
+
+    return {
+        "path": new_path,
+        "format": fmt.lower() or None,
+        "width": width,
+        "height": height,
+        "thumb_path": thumb_path,
+    }
@@ -1,26 +1,316 @@
-import subprocess
+import asyncio
+import sys
+import time
+from dataclasses import dataclass
 from datetime import datetime
-from nonebot import on_command, Bot
-from nonebot.adapters.onebot.v11 import MessageEvent, MessageSegment
+from pathlib import Path
+from nonebot import on_command, on_notice, Bot, get_driver, logger
+from nonebot.adapters.onebot.v11 import (
+    FriendAddNoticeEvent,
+    GroupDecreaseNoticeEvent,
+    GroupIncreaseNoticeEvent,
+    Message,
+    MessageEvent,
+    MessageSegment,
+    NoticeEvent,
+)
+from nonebot.matcher import Matcher
+from nonebot.message import run_postprocessor, run_preprocessor
+from nonebot.params import CommandArg
+from nonebot.typing import T_State
 import nonebot
 
+current_dir = Path(__file__).parent
+if str(current_dir) not in sys.path:
+    sys.path.append(str(current_dir))
+
+try:
+    from status_collector import SystemCollector
+except ImportError:
+    try:
+        from .status_collector import SystemCollector
+    except ImportError:
+        from src.plugins.status_collector import SystemCollector
+
+try:
+    from status_perf import GaugeRegistry, HandlerStats, LoopLagMonitor, register_metrics_endpoint
+except ImportError:
+    try:
+        from .status_perf import GaugeRegistry, HandlerStats, LoopLagMonitor
+    except ImportError:
+        from src.plugins.status_perf import GaugeRegistry, HandlerStats, LoopLagMonitor
+
+try:
+    from ww_db_helper import db
+except ImportError:
+    try:
+        from .ww_db_helper import db
+    except ImportError:
+        from src.plugins.ww_db_helper import db
+
+driver = get_driver()
+
 # 创建命令处理器
 info_command = on_command("/status", priority=5)
 
 # 记录Bot启动时间
 bot_start_time = datetime.now()
 
+# 系统信息由后台定时采样，/status 只读取最近一次的快照
+collector = SystemCollector(getattr(driver.config, "status_disk_path", None))
+_sample_task: asyncio.Task | None = None
+
+
+async def _sample_loop():
+    interval = max(1.0, float(getattr(driver.config, "status_sample_interval", 10)))
+    while True:
+        try:
+            await asyncio.to_thread(collector.sample)
+        except Exception as e:
+            collector.stats["errors"] += 1
+            logger.warning(f"系统信息采样失败: {e}")
+        await asyncio.sleep(interval)
+
+
+@dataclass
+class BotInfo:
+    user_id: int
+    nickname: str
+    friend_count: int
+    group_count: int
+    updated_at: float
+
+
+class BotInfoCache:
+    """
+    Bot 账号信息缓存 (按 self_id)：
+    - 未命中时并发请求 登录信息/好友列表/群列表，同一个 Bot 的并发刷新合并为一次
+    - 过期后仍先返回旧值，同时在后台刷新
+    - 入群/退群/加好友通知直接修正计数，不必重新拉取完整列表
+    """
+
+    def __init__(self, ttl: float = 600):
+        self.ttl = ttl
+        self._info: dict[str, BotInfo] = {}
+        self._tasks: dict[str, asyncio.Task] = {}
+        self.stats = {"hits": 0, "misses": 0, "refreshes": 0, "notices": 0}
+
+    async def _fetch(self, bot: Bot) -> BotInfo:
+        login, friends, groups = await asyncio.gather(
+            bot.get_login_info(), bot.get_friend_list(), bot.get_group_list()
+        )
+        info = BotInfo(
+            user_id=int(login["user_id"]),
+            nickname=str(login.get("nickname") or ""),
+            friend_count=len(friends),
+            group_count=len(groups),
+            updated_at=time.time(),
+        )
+        self._info[bot.self_id] = info
+        self.stats["refreshes"] += 1
+        return info
+
+    def refresh(self, bot: Bot) -> asyncio.Task:
+        task = self._tasks.get(bot.self_id)
+        if task is None or task.done():
+            task = asyncio.create_task(self._fetch(bot))
+            task.add_done_callback(lambda t, sid=bot.self_id: self._on_done(sid, t))
+            self._tasks[bot.self_id] = task
+        return task
+
+    def _on_done(self, self_id: str, task: asyncio.Task):
+        if self._tasks.get(self_id) is task:
+            del self._tasks[self_id]
+        if not task.cancelled() and task.exception() is not None:
+            logger.warning(f"Bot 信息刷新失败 self_id={self_id}: {task.exception()}")
+
+    async def get(self, bot: Bot) -> BotInfo:
+        info = self._info.get(bot.self_id)
+        if info is None:
+            self.stats["misses"] += 1
+            return await asyncio.shield(self.refresh(bot))
+        self.stats["hits"] += 1
+        if time.time() - info.updated_at > self.ttl:
+            self.refresh(bot)
+        return info
+
+    def adjust(self, self_id: str, friends: int = 0, groups: int = 0):
+        info = self._info.get(self_id)
+        if info is None:
+            return
+        info.friend_count = max(0, info.friend_count + friends)
+        info.group_count = max(0, info.group_count + groups)
+        self.stats["notices"] += 1
+
+    def drop(self, self_id: str):
+        self._info.pop(self_id, None)
+        task = self._tasks.pop(self_id, None)
+        if task is not None:
+            task.cancel()
+
+
+bot_info_cache = BotInfoCache(ttl=float(getattr(driver.config, "status_info_ttl", 600)))
+_refresh_task: asyncio.Task | None = None
+
+
+async def _refresh_loop():
+    """定时刷新所有已连接 Bot 的账号信息"""
+    interval = max(60.0, bot_info_cache.ttl)
+    while True:
+        await asyncio.sleep(interval)
+        for bot in list(nonebot.get_bots().values()):
+            bot_info_cache.refresh(bot)
+
+
+# 运行时性能：事件循环延迟、各匹配器处理耗时、子系统指标
+loop_monitor = LoopLagMonitor(float(getattr(driver.config, "status_lag_interval", 0.5)))
+handler_stats = HandlerStats()
+gauges = GaugeRegistry()
+_PERF_KEY = "_status_perf"
+
+
+def _handler_key(matcher: Matcher, state: T_State) -> str:
+    """统一路由分发的命令按路由统计，其余按 插件.处理函数"""
+    route = state.get("_ww_route")
+    if route is not None:
+        return route.route.name
+    name = matcher.handlers[0].call.__name__ if matcher.handlers else type(matcher).__name__
+    return f"{matcher.plugin_name or matcher.module_name}.{name}"
+
+
+@run_preprocessor
+async def _perf_begin(matcher: Matcher, state: T_State):
+    # 预处理时规则写入的 state 还没合并进 matcher.state，需要单独注入
+    key = _handler_key(matcher, state)
+    matcher.state[_PERF_KEY] = (key, time.perf_counter())
+    handler_stats.begin(key)
+
+
+@run_postprocessor
+async def _perf_end(matcher: Matcher, exception: Exception | None):
+    perf = matcher.state.pop(_PERF_KEY, None)
+    if perf is None:
+        return
+    key, start = perf
+    handler_stats.end(key, time.perf_counter() - start, error=exception is not None)
+
+
+def _plugin_module(name: str):
+    # 辅助模块优先取其他插件同级导入的那份实例 (裸模块名)，单文件插件取 NoneBot 加载的模块
+    module = sys.modules.get(name)
+    if module is not None:
+        return module
+    plugin = nonebot.get_plugin(name)
+    return plugin.module if plugin is not None else None
+
+
+def _gauges_from(name: str, build):
+    """子系统按插件名懒加载，未加载的插件不出现在结果里"""
+    def collect():
+        module = _plugin_module(name)
+        return build(module) if module is not None else None
+    return collect
+
+
+def _kuro_gauges(m) -> dict:
+    st = m.kuro_stats()
+    return {
+        "inflight": st["coalesce"]["inflight"],
+        "cache_entries": st["cache"]["entries"],
+        "cache_bytes": st["cache"]["memory_bytes"],
+        "trace_buffered": st["trace"]["buffered"],
+    }
+
+
+def _card_gauges(m) -> dict:
+    st = m.card_cache.snapshot()
+    return {"cache_entries": st["entries"], "cache_bytes": st["memory_bytes"]}
+
+
+def _imgd_gauges(m) -> dict:
+    return {
+        "queued": m.download_queue.qsize(),
+        "pipeline_backlog": m.pipeline.backlog(),
+        "downloaded_bytes": m.download_stats["bytes"],
+    }
+
+
+gauges.register("asyncio", lambda: {"tasks": len(asyncio.all_tasks()), "handlers_inflight": handler_stats.inflight()})
+gauges.register("kuro", _gauges_from("wwSrcoe", _kuro_gauges))
+gauges.register("card", _gauges_from("ww_card_cache", _card_gauges))
+gauges.register("imgd", _gauges_from("imgd", _imgd_gauges))
+gauges.register("bili", _gauges_from("ww_bili_dynamic_plugin", lambda m: {"pending_sends": len(m._pending_send_tasks)}))
+gauges.register("chehui", _gauges_from("chehui", lambda m: {"trigger_words": m._state["config"].word_count}))
+gauges.register("router", _gauges_from("ww_router", lambda m: dict(m.router.stats)))
+
+
+@driver.on_startup
+async def _start_sampler():
+    global _sample_task, _refresh_task
+    _sample_task = asyncio.create_task(_sample_loop())
+    _refresh_task = asyncio.create_task(_refresh_loop())
+    loop_monitor.start()
+
+
+@driver.on_shutdown
+async def _stop_sampler():
+    for task in (_sample_task, _refresh_task):
+        if task is not None:
+            task.cancel()
+    loop_monitor.stop()
+
+
+@driver.on_bot_connect
+async def _warm_bot_info(bot: Bot):
+    bot_info_cache.refresh(bot)
+
+
+@driver.on_bot_disconnect
+async def _drop_bot_info(bot: Bot):
+    bot_info_cache.drop(bot.self_id)
+
+
+async def _is_info_notice(bot: Bot, event: NoticeEvent) -> bool:
+    if isinstance(event, FriendAddNoticeEvent):
+        return True
+    # 只关心 Bot 自己入群/退群 (被踢)，其他成员变动不影响群数量
+    if isinstance(event, (GroupIncreaseNoticeEvent, GroupDecreaseNoticeEvent)):
+        return str(event.user_id) == bot.self_id
+    return False
+
+
+info_notice = on_notice(rule=_is_info_notice, priority=1, block=False)
+
+
+@info_notice.handle()
+async def handle_info_notice(bot: Bot, event: NoticeEvent):
+    if isinstance(event, FriendAddNoticeEvent):
+        bot_info_cache.adjust(bot.self_id, friends=1)
+    elif isinstance(event, GroupIncreaseNoticeEvent):
+        bot_info_cache.adjust(bot.self_id, groups=1)
+    else:
+        bot_info_cache.adjust(bot.self_id, groups=-1)
+
+
 @info_command.handle()
-async def handle_info(bot: Bot, event: MessageEvent):
-    # 获取Bot的信息
-    bot_info = await bot.get_login_info()
-    friend_list = await bot.get_friend_list()
-    group_list = await bot.get_group_list()
-    friend_count = len(friend_list)
-    group_count = len(group_list)
+async def handle_info(bot: Bot, event: MessageEvent, args: Message = CommandArg()):
+    arg = args.extract_plain_text().strip()
+    if arg in ("性能", "perf"):
+        await info_command.finish(format_perf(10))
+    if arg in ("性能重置", "perf reset"):
+        handler_stats.reset()
+        await info_command.finish("处理耗时统计已重置")
+
+    # 获取Bot的信息 (缓存，未命中时并发请求)
+    try:
+        bot_info = await bot_info_cache.get(bot)
+    except Exception as e:
+        await info_command.finish(f"获取Bot信息失败：{e}")
+    friend_count = bot_info.friend_count
+    group_count = bot_info.group_count
 
     # 获取系统信息
-    system_info = get_fastfetch_info()
+    system_info = await get_system_info()
 
     # 获取Bot适配器名称
     adapter_name = bot.adapter.get_name()
@@ -29,13 +319,13 @@ async def handle_info(bot: Bot, event: MessageEvent):
     nonebot_info = f"NoneBot2版本: {nonebot.__version__}\n"
 
     # 添加Bot相关信息
-    nonebot_info += f"Bot账号: QQ {bot_info['user_id']}\n"
+    nonebot_info += f"Bot账号: QQ {bot_info.user_id}\n"
     nonebot_info += f"好友: {friend_count}个\n"
     nonebot_info += f"群聊: {group_count}个\n"
     nonebot_info += f"Bot连接协议: {adapter_name}\n"  # 添加Bot连接协议
 
     # 生成最终文本信息
-    text_content = nonebot_info + system_info
+    text_content = nonebot_info + system_info + "\n" + format_perf_brief()
 
     # 确保 reply_message 有效
     reply_message = MessageSegment.text(text_content)
@@ -45,15 +335,79 @@ async def handle_info(bot: Bot, event: MessageEvent):
     await bot.send(event, reply_message)
 
 
-def get_fastfetch_info():
+async def get_system_info():
+    snapshot = collector.snapshot()
     try:
-        # 调用 fastfetch 并获取输出
-        output = subprocess.check_output("fastfetch -l none", shell=True).decode().strip()
-        
-        # 删除最后 5 行
-        lines = output.splitlines()  # 将输出按行分割成列表
-        trimmed_output = "\n".join(lines[:-5])  # 去掉最后 5 行后重新拼接
-
-        return trimmed_output
+        if snapshot is None:
+            # 后台还没完成第一次采样时才同步采一次 (放在线程里，不阻塞事件循环)
+            snapshot = await asyncio.to_thread(collector.sample)
+        return snapshot.format()
     except Exception as e:
         return f"无法获取系统信息：{str(e)}"
+
+
+def _mib(n: int) -> str:
+    return f"{n / 1024 ** 2:.1f}MiB"
+
+
+def format_perf_brief() -> str:
+    lag = loop_monitor.histogram
+    return (
+        f"事件循环延迟: 当前 {loop_monitor.last * 1000:.1f}ms p95 {lag.quantile(0.95) * 1000:.0f}ms "
+        f"最大 {lag.max * 1000:.0f}ms\n"
+        f"任务: {len(asyncio.all_tasks())} 个，处理中 {handler_stats.inflight()} 个 (/status 性能 查看详情)"
+    )
+
+
+def format_perf(top: int = 10) -> str:
+    lines = ["📈 运行时性能", format_perf_brief()]
+    items = handler_stats.snapshot()
+    if items:
+        lines.append(f"处理耗时（按总耗时前 {min(top, len(items))} 个）")
+        for item in items[:top]:
+            lines.append(
+                f"{item['key']}\n"
+                f"  次数 {item['count']}（失败 {item['errors']}，处理中 {item['inflight']}）"
+                f" 平均 {item['mean_ms']:.1f}ms p50/p95≤{item['p50_ms']:.0f}/{item['p95_ms']:.0f}ms 最大 {item['max_ms']:.0f}ms"
+            )
+    values = gauges.collect()
+    if values:
+        lines.append("子系统")
+        for name, metrics in values.items():
+            parts = [f"{k}={_mib(v) if k.endswith('_bytes') else v}" for k, v in metrics.items()]
+            lines.append(f"  {name}: " + " ".join(parts))
+    snapshot = collector.snapshot()
+    if snapshot is not None:
+        lines.append(f"Bot进程: RSS {_mib(snapshot.proc_rss)} CPU {snapshot.proc_cpu_percent:.0f}%")
+    return "\n".join(lines)
+
+
+def prometheus_lines() -> list[str]:
+    lines = ["# TYPE nb_event_loop_lag_seconds histogram"]
+    lines.extend(loop_monitor.histogram.prometheus_lines("nb_event_loop_lag_seconds"))
+    lines.extend(handler_stats.prometheus_lines())
+    lines.extend(gauges.prometheus_lines())
+    snapshot = collector.snapshot()
+    if snapshot is not None:
+        lines.extend([
+            "# TYPE nb_process_resident_memory_bytes gauge",
+            f"nb_process_resident_memory_bytes {snapshot.proc_rss}",
+            "# TYPE nb_process_cpu_percent gauge",
+            f"nb_process_cpu_percent {snapshot.proc_cpu_percent}",
+            "# TYPE nb_system_cpu_percent gauge",
+            f"nb_system_cpu_percent {snapshot.cpu_percent}",
+            "# TYPE nb_system_memory_used_bytes gauge",
+            f"nb_system_memory_used_bytes {snapshot.mem_used}",
+        ])
+    lines.extend(db.stats.prometheus_lines())
+    return lines
+
+
+def _setup_metrics_endpoint():
+    # 默认关闭，配置 STATUS_METRICS_PATH=/metrics 后启用；已包含数据库语句统计
+    path = getattr(driver.config, "status_metrics_path", "")
+    if path:
+        register_metrics_endpoint(driver, path, "status_metrics", prometheus_lines, "性能指标")
+
+
+_setup_metrics_endpoint()
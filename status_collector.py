@@ -0,0 +1,201 @@
+from __future__ import annotations
+
+import os
+import platform
+import socket
+import sys
+import threading
+import time
+from dataclasses import dataclass, field
+
+import psutil
+
+# distro 只在 Linux 上有意义，缺失时回退到 platform
+try:
+    import distro
+except ImportError:
+    distro = None
+
+if __name__ != "status_collector":
+    sys.modules.setdefault("status_collector", sys.modules[__name__])
+
+_GIB = 1024 ** 3
+
+
+def _os_name() -> str:
+    if distro is not None and sys.platform.startswith("linux"):
+        name = distro.name(pretty=True)
+        if name:
+            return f"{name} {platform.machine()}"
+    return f"{platform.system()} {platform.release()} {platform.machine()}"
+
+
+def _cpu_model() -> str:
+    if sys.platform.startswith("linux"):
+        try:
+            with open("/proc/cpuinfo", "r", encoding="utf-8", errors="ignore") as f:
+                for line in f:
+                    if line.startswith("model name"):
+                        return line.split(":", 1)[1].strip()
+        except OSError:
+            pass
+    return platform.processor() or platform.machine() or "未知"
+
+
+def _format_duration(seconds: float) -> str:
+    minutes, _ = divmod(int(seconds), 60)
+    hours, minutes = divmod(minutes, 60)
+    days, hours = divmod(hours, 24)
+    if days:
+        return f"{days} days, {hours} hours, {minutes} mins"
+    if hours:
+        return f"{hours} hours, {minutes} mins"
+    return f"{minutes} mins"
+
+
+@dataclass(frozen=True)
+class StaticInfo:
+    """启动后不会变化的信息，只采集一次"""
+    os: str
+    host: str
+    kernel: str
+    cpu: str
+    cores_physical: int | None
+    cores_logical: int | None
+    python: str
+    boot_time: float
+
+
+@dataclass(frozen=True)
+class SystemSnapshot:
+    static: StaticInfo
+    taken_at: float
+    cpu_percent: float
+    load_avg: tuple[float, float, float] | None
+    mem_used: int
+    mem_total: int
+    mem_percent: float
+    swap_used: int
+    swap_total: int
+    disk_path: str
+    disk_used: int
+    disk_total: int
+    disk_percent: float
+    process_count: int
+    proc_rss: int
+    proc_cpu_percent: float
+    proc_threads: int
+    proc_fds: int | None
+    extra: dict = field(default_factory=dict)
+
+    def format(self) -> str:
+        s = self.static
+        cores = f"{s.cores_physical or '?'}C/{s.cores_logical or '?'}T"
+        lines = [
+            f"OS: {s.os}",
+            f"Host: {s.host}",
+            f"Kernel: {s.kernel}",
+            f"Uptime: {_format_duration(self.taken_at - s.boot_time)}",
+            f"CPU: {s.cpu} ({cores}) {self.cpu_percent:.0f}%",
+        ]
+        if self.load_avg is not None:
+            lines.append("Load: " + " ".join(f"{x:.2f}" for x in self.load_avg))
+        lines.append(f"Memory: {self.mem_used / _GIB:.2f} GiB / {self.mem_total / _GIB:.2f} GiB ({self.mem_percent:.0f}%)")
+        if self.swap_total:
+            lines.append(f"Swap: {self.swap_used / _GIB:.2f} GiB / {self.swap_total / _GIB:.2f} GiB")
+        lines.append(
+            f"Disk ({self.disk_path}): {self.disk_used / _GIB:.2f} GiB / {self.disk_total / _GIB:.2f} GiB ({self.disk_percent:.0f}%)"
+        )
+        lines.append(f"Processes: {self.process_count}")
+        proc = f"Bot进程: {self.proc_rss / 1024 ** 2:.0f} MiB, CPU {self.proc_cpu_percent:.0f}%, 线程 {self.proc_threads}"
+        if self.proc_fds is not None:
+            proc += f", 文件句柄 {self.proc_fds}"
+        lines.append(proc)
+        lines.append(f"Python: {s.python}")
+        return "\n".join(lines)
+
+
+class SystemCollector:
+    """
+    进程内的系统信息采集：
+    - 静态信息首次采样时读取一次
+    - CPU 使用率用 psutil 的非阻塞模式，计算的是两次采样之间的平均值
+    - sample() 是同步的，由调用方放到线程里定时执行；snapshot() 只返回最近一次的结果
+    """
+
+    def __init__(self, disk_path: str | None = None):
+        self.disk_path = disk_path or os.path.abspath(os.sep)
+        self._process = psutil.Process()
+        self._static: StaticInfo | None = None
+        self._snapshot: SystemSnapshot | None = None
+        self._lock = threading.Lock()
+        self.stats = {"samples": 0, "errors": 0, "last_ms": 0.0}
+
+    def _collect_static(self) -> StaticInfo:
+        return StaticInfo(
+            os=_os_name(),
+            host=socket.gethostname(),
+            kernel=platform.release(),
+            cpu=_cpu_model(),
+            cores_physical=psutil.cpu_count(logical=False),
+            cores_logical=psutil.cpu_count(logical=True),
+            python=platform.python_version(),
+            boot_time=psutil.boot_time(),
+        )
+
+    def sample(self) -> SystemSnapshot:
+        start = time.perf_counter()
+        with self._lock:
+            if self._static is None:
+                self._static = self._collect_static()
+                # 第一次调用只建立基准，返回 0
+                psutil.cpu_percent(interval=None)
+                self._process.cpu_percent(interval=None)
+            try:
+                load_avg = psutil.getloadavg()
+            except (AttributeError, OSError):
+                load_avg = None
+            mem = psutil.virtual_memory()
+            swap = psutil.swap_memory()
+            disk = psutil.disk_usage(self.disk_path)
+            proc = self._process
+            with proc.oneshot():
+                rss = proc.memory_info().rss
+                proc_cpu = proc.cpu_percent(interval=None)
+                threads = proc.num_threads()
+                fds = proc.num_fds() if hasattr(proc, "num_fds") else None
+            snapshot = SystemSnapshot(
+                static=self._static,
+                taken_at=time.time(),
+                cpu_percent=psutil.cpu_percent(interval=None),
+                load_avg=load_avg,
+                mem_used=mem.total - mem.available,
+                mem_total=mem.total,
+                mem_percent=mem.percent,
+                swap_used=swap.used,
+                swap_total=swap.total,
+                disk_path=self.disk_path,
+                disk_used=disk.used,
+                disk_total=disk.total,
+                disk_percent=disk.percent,
+                process_count=len(psutil.pids()),
+                proc_rss=rss,
+                proc_cpu_percent=proc_cpu,
+                proc_threads=threads,
+                proc_fds=fds,
+            )
+            self._snapshot = snapshot
+            self.stats["samples"] += 1
+            self.stats["last_ms"] = (time.perf_counter() - start) * 1000
+        return snapshot
+
+    def snapshot(self) -> SystemSnapshot | None:
+        return self._snapshot
+
+
+if __name__ == "__main__":
+    collector = SystemCollector()
+    collector.sample()
+    time.sleep(1)
+    print(collector.sample().format())
+    print(collector.stats)
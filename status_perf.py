@@ -0,0 +1,236 @@
+from __future__ import annotations
+
+import asyncio
+import bisect
+import sys
+import time
+from typing import Callable
+
+if __name__ != "status_perf":
+    sys.modules.setdefault("status_perf", sys.modules[__name__])
+
+# 秒，最后一个桶为 +Inf
+DEFAULT_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0)
+LAG_BUCKETS = (0.001, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5)
+
+
+def _label(value) -> str:
+    return str(value)[:200].replace("\\", "\\\\").replace('"', '\\"').replace("\n", " ")
+
+
+def _labels(labels: dict) -> str:
+    return ",".join(f'{k}="{_label(v)}"' for k, v in labels.items())
+
+
+class LatencyHistogram:
+    """固定桶直方图：记录是 O(log 桶数)，内存固定；分位数按桶上界估算"""
+
+    def __init__(self, buckets: tuple[float, ...] = DEFAULT_BUCKETS):
+        self.buckets = tuple(sorted(buckets))
+        self.counts = [0] * (len(self.buckets) + 1)
+        self.count = 0
+        self.sum = 0.0
+        self.max = 0.0
+
+    def observe(self, seconds: float):
+        self.counts[bisect.bisect_left(self.buckets, seconds)] += 1
+        self.count += 1
+        self.sum += seconds
+        if seconds > self.max:
+            self.max = seconds
+
+    def quantile(self, q: float) -> float:
+        if not self.count:
+            return 0.0
+        rank = q * self.count
+        seen = 0
+        for i, n in enumerate(self.counts):
+            seen += n
+            if seen >= rank:
+                return min(self.buckets[i], self.max) if i < len(self.buckets) else self.max
+        return self.max
+
+    @property
+    def mean(self) -> float:
+        return self.sum / self.count if self.count else 0.0
+
+    def prometheus_lines(self, name: str, labels: dict | None = None) -> list[str]:
+        base = _labels(labels or {})
+        sep = "," if base else ""
+        lines = []
+        cumulative = 0
+        for bound, n in zip(self.buckets, self.counts):
+            cumulative += n
+            lines.append(f'{name}_bucket{{{base}{sep}le="{bound}"}} {cumulative}')
+        lines.append(f'{name}_bucket{{{base}{sep}le="+Inf"}} {self.count}')
+        suffix = f"{{{base}}}" if base else ""
+        lines.append(f"{name}_sum{suffix} {self.sum:.6f}")
+        lines.append(f"{name}_count{suffix} {self.count}")
+        return lines
+
+
+class LoopLagMonitor:
+    """
+    事件循环延迟：定时 sleep(interval)，实际醒来时间比预期晚多少就是这段时间里
+    循环被阻塞 (同步 I/O、CPU 密集代码) 的程度
+    """
+
+    def __init__(self, interval: float = 0.5):
+        self.interval = interval
+        self.histogram = LatencyHistogram(LAG_BUCKETS)
+        self.last = 0.0
+        self._task: asyncio.Task | None = None
+
+    async def _run(self):
+        while True:
+            start = time.perf_counter()
+            await asyncio.sleep(self.interval)
+            lag = max(0.0, time.perf_counter() - start - self.interval)
+            self.last = lag
+            self.histogram.observe(lag)
+
+    def start(self):
+        if self._task is None or self._task.done():
+            self._task = asyncio.create_task(self._run())
+
+    def stop(self):
+        if self._task is not None:
+            self._task.cancel()
+            self._task = None
+
+
+class HandlerStats:
+    """
+    按匹配器 (或路由) 汇总的处理耗时：直方图、失败次数、当前正在运行的数量
+    只在事件循环线程中调用，无需加锁
+    """
+
+    def __init__(self, buckets: tuple[float, ...] = DEFAULT_BUCKETS):
+        self.buckets = buckets
+        self._items: dict[str, dict] = {}
+
+    def _item(self, key: str) -> dict:
+        item = self._items.get(key)
+        if item is None:
+            item = self._items[key] = {"hist": LatencyHistogram(self.buckets), "errors": 0, "inflight": 0}
+        return item
+
+    def begin(self, key: str):
+        self._item(key)["inflight"] += 1
+
+    def end(self, key: str, seconds: float, error: bool = False):
+        item = self._item(key)
+        item["inflight"] = max(0, item["inflight"] - 1)
+        item["hist"].observe(seconds)
+        if error:
+            item["errors"] += 1
+
+    def reset(self):
+        # 保留正在运行的计数，避免结束时减成负数
+        for item in self._items.values():
+            item["hist"] = LatencyHistogram(self.buckets)
+            item["errors"] = 0
+
+    def inflight(self) -> int:
+        return sum(item["inflight"] for item in self._items.values())
+
+    def snapshot(self) -> list[dict]:
+        """导出统计 (毫秒)，按总耗时倒序"""
+        result = []
+        for key, item in self._items.items():
+            hist = item["hist"]
+            result.append({
+                "key": key,
+                "count": hist.count,
+                "errors": item["errors"],
+                "inflight": item["inflight"],
+                "total_ms": hist.sum * 1000,
+                "mean_ms": hist.mean * 1000,
+                "p50_ms": hist.quantile(0.50) * 1000,
+                "p95_ms": hist.quantile(0.95) * 1000,
+                "max_ms": hist.max * 1000,
+            })
+        result.sort(key=lambda x: x["total_ms"], reverse=True)
+        return result
+
+    def prometheus_lines(self) -> list[str]:
+        lines = [
+            "# TYPE nb_handler_latency_seconds histogram",
+            "# TYPE nb_handler_errors_total counter",
+            "# TYPE nb_handler_inflight gauge",
+        ]
+        for key, item in self._items.items():
+            labels = {"handler": key}
+            lines.extend(item["hist"].prometheus_lines("nb_handler_latency_seconds", labels))
+            lines.append(f"nb_handler_errors_total{{{_labels(labels)}}} {item['errors']}")
+            lines.append(f"nb_handler_inflight{{{_labels(labels)}}} {item['inflight']}")
+        return lines
+
+
+class GaugeRegistry:
+    """
+    子系统指标：每个子系统注册一个返回 {指标名: 数值} 的函数，读取时才调用
+    函数返回 None 表示该子系统未加载
+    """
+
+    def __init__(self):
+        self._gauges: dict[str, Callable[[], dict | None]] = {}
+
+    def register(self, subsystem: str, fn: Callable[[], dict | None]):
+        self._gauges[subsystem] = fn
+
+    def collect(self) -> dict[str, dict]:
+        result = {}
+        for name, fn in self._gauges.items():
+            try:
+                values = fn()
+            except Exception:
+                continue
+            if values:
+                result[name] = values
+        return result
+
+    def prometheus_lines(self, values: dict[str, dict] | None = None) -> list[str]:
+        lines = ["# TYPE nb_subsystem gauge"]
+        for subsystem, metrics in (values if values is not None else self.collect()).items():
+            for metric, value in metrics.items():
+                lines.append(f'nb_subsystem{{{_labels({"subsystem": subsystem, "metric": metric})}}} {value}')
+        return lines
+
+
+PROMETHEUS_CONTENT_TYPE = "text/plain; version=0.0.4; charset=utf-8"
+
+# 已注册的端点路径 -> 名称，同一路径只注册一次
+_metrics_endpoints: dict[str, str] = {}
+
+
+def register_metrics_endpoint(driver, path: str, name: str, collect: Callable[[], list[str]], title: str) -> bool:
+    """
+    在驱动器上注册只读的 Prometheus 文本端点 (无鉴权，调用方负责默认关闭)
+    :param collect: 每次请求时调用，返回指标行
+    :param title: 日志里显示的端点名称
+    :return: 是否注册成功
+    """
+    from nonebot.log import logger
+
+    path = str(path)
+    if path in _metrics_endpoints:
+        logger.warning(f"{title}端点路径 {path} 已被 {_metrics_endpoints[path]} 使用，未重复注册")
+        return False
+    try:
+        from nonebot.drivers import URL, ASGIMixin, HTTPServerSetup, Request, Response
+    except ImportError:
+        logger.info(f"当前 NoneBot 版本不支持注册 HTTP 路由，{title}端点未启用")
+        return False
+    if not isinstance(driver, ASGIMixin):
+        logger.info(f"当前驱动器不支持 HTTP 服务，{title}端点未启用")
+        return False
+
+    async def metrics(request: Request) -> Response:
+        text = "\n".join(collect()) + "\n"
+        return Response(200, headers={"Content-Type": PROMETHEUS_CONTENT_TYPE}, content=text)
+
+    driver.setup_http_server(HTTPServerSetup(URL(path), "GET", name, metrics))
+    _metrics_endpoints[path] = name
+    logger.info(f"{title}端点已启用: {path}")
+    return True
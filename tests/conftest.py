@@ -0,0 +1,12 @@
+import sys
+import tempfile
+from pathlib import Path
+
+import nonebot
+
+ROOT = Path(__file__).resolve().parent.parent
+if str(ROOT) not in sys.path:
+    sys.path.insert(0, str(ROOT))
+
+# ww_db_helper 导入时会 require localstore 并创建数据库，数据目录放到临时目录
+nonebot.init(localstore_data_dir=tempfile.mkdtemp(prefix="nb2_plugins_test_"))
@@ -0,0 +1,46 @@
+import pytest
+
+from chehui_matcher import AhoCorasick, Normalizer, lazy_pinyin
+
+
+def naive_find(words, text, normalizer):
+    text = normalizer(text)
+    return [w for w in dict.fromkeys(words) if normalizer(w) and normalizer(w) in text]
+
+
+def test_search_and_find_all():
+    ac = AhoCorasick(["那咋了", "咋了", "he", "she", "hers"])
+    assert ac.search("你那咋了啊")
+    assert not ac.search("没事")
+    assert ac.find_all("ushers") == ["she", "he", "hers"]
+    assert ac.find_all("那咋了") == ["那咋了", "咋了"]
+
+
+def test_overlapping_fail_links_match_naive():
+    words = ["abcd", "bc", "bcde", "c", "cdx", "xab", "a"]
+    ac = AhoCorasick(words)
+    for text in ("abcdxabcde", "bcbcbc", "xxxx", "cdxab", ""):
+        assert sorted(ac.find_all(text)) == sorted(naive_find(words, text, ac.normalizer))
+
+
+def test_duplicates_and_empty_words_ignored():
+    ac = AhoCorasick(["那咋了", "那咋了", ""])
+    assert len(ac) == 1
+    assert ac.words == ["那咋了"]
+
+
+def test_nfkc_and_casefold():
+    ac = AhoCorasick(["sb"], Normalizer(nfkc=True, casefold=True))
+    assert ac.search("你是ＳＢ吗")
+    assert ac.search("SB")
+    plain = AhoCorasick(["sb"], Normalizer(nfkc=False, casefold=False))
+    assert not plain.search("ＳＢ")
+    assert not plain.search("SB")
+
+
+@pytest.mark.skipif(lazy_pinyin is None, reason="pypinyin 未安装")
+def test_pinyin_homophones():
+    ac = AhoCorasick(["傻逼"], Normalizer(pinyin=True))
+    assert ac.search("你个沙比")
+    # 拼音两侧有分隔符，相邻字的读音拼接不会误命中
+    assert not AhoCorasick(["xian"], Normalizer(pinyin=True)).search("西安")
@@ -0,0 +1,36 @@
+import os
+
+import pytest
+from PIL import Image
+
+import imgd_pipeline
+from imgd_pipeline import process_image
+
+
+@pytest.fixture
+def png_as_jpg(tmp_path):
+    # 扩展名与真实格式不符的图片
+    path = tmp_path / "img" / "abcdef.jpg"
+    path.parent.mkdir()
+    Image.new("RGB", (600, 300), "red").save(path, format="PNG")
+    return path
+
+
+def test_fixes_extension_and_writes_thumbnail(png_as_jpg, tmp_path):
+    result = process_image(str(png_as_jpg), str(tmp_path / "thumbs"), thumb_size=64)
+    assert result["path"] == str(png_as_jpg.with_suffix(".png"))
+    assert os.path.exists(result["path"]) and not png_as_jpg.exists()
+    assert (result["format"], result["width"], result["height"]) == ("png", 600, 300)
+    with Image.open(result["thumb_path"]) as thumb:
+        assert max(thumb.size) == 64
+
+
+def test_thumbnail_failure_keeps_original_path(png_as_jpg, tmp_path, monkeypatch):
+    def broken_save(self, *args, **kwargs):
+        raise OSError("No space left on device")
+
+    monkeypatch.setattr(imgd_pipeline.Image.Image, "save", broken_save)
+    with pytest.raises(OSError):
+        process_image(str(png_as_jpg), str(tmp_path / "thumbs"))
+    assert png_as_jpg.exists()
+    assert not any(p.is_file() for p in (tmp_path / "thumbs").rglob("*"))
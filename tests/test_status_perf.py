@@ -0,0 +1,55 @@
+import pytest
+
+from status_perf import GaugeRegistry, HandlerStats, LatencyHistogram
+
+
+def test_quantile_uses_bucket_bounds_and_clamps_to_max():
+    hist = LatencyHistogram((0.1, 0.5, 1.0))
+    for v in (0.05, 0.05, 0.2, 0.3):
+        hist.observe(v)
+    assert hist.quantile(0.5) == 0.1
+    assert hist.quantile(0.95) == 0.3
+    assert hist.mean == pytest.approx(0.15)
+    assert LatencyHistogram().quantile(0.5) == 0.0
+
+
+def test_quantile_overflow_bucket_returns_max():
+    hist = LatencyHistogram((0.1,))
+    hist.observe(0.01)
+    hist.observe(7.0)
+    assert hist.quantile(0.99) == 7.0
+
+
+def test_prometheus_buckets_are_cumulative():
+    hist = LatencyHistogram((0.1, 1.0))
+    for v in (0.05, 0.5, 2.0):
+        hist.observe(v)
+    lines = hist.prometheus_lines("x", {"h": 'a"b'})
+    assert lines[:3] == [
+        'x_bucket{h="a\\"b",le="0.1"} 1',
+        'x_bucket{h="a\\"b",le="1.0"} 2',
+        'x_bucket{h="a\\"b",le="+Inf"} 3',
+    ]
+    assert lines[-1] == 'x_count{h="a\\"b"} 3'
+
+
+def test_handler_stats_inflight_and_reset():
+    stats = HandlerStats()
+    stats.begin("a")
+    stats.begin("a")
+    stats.end("a", 0.2, error=True)
+    assert stats.inflight() == 1
+    (item,) = stats.snapshot()
+    assert item["count"] == 1 and item["errors"] == 1
+    stats.reset()
+    stats.end("a", 0.1)
+    (item,) = stats.snapshot()
+    assert item["count"] == 1 and item["errors"] == 0 and item["inflight"] == 0
+
+
+def test_gauge_registry_skips_failing_and_empty():
+    gauges = GaugeRegistry()
+    gauges.register("ok", lambda: {"queue": 3})
+    gauges.register("missing", lambda: None)
+    gauges.register("broken", lambda: 1 / 0)
+    assert gauges.collect() == {"ok": {"queue": 3}}
@@ -0,0 +1,99 @@
+import asyncio
+import sqlite3
+import uuid
+from contextlib import aclosing
+
+import pytest
+
+from ww_db_helper import DBHelper
+
+
+@pytest.fixture
+def helper():
+    helper = DBHelper(f"test_{uuid.uuid4().hex}.db")
+    asyncio.run(helper.execute_batch([
+        ("CREATE TABLE t (id INTEGER PRIMARY KEY, grp INTEGER, name TEXT)", ()),
+        *(("INSERT INTO t (id, grp, name) VALUES (?, ?, ?)", (i, i % 3, f"n{i}")) for i in range(1, 11)),
+    ]))
+    yield helper
+    for suffix in ("", "-wal", "-shm"):
+        helper.db_path.with_name(helper.db_path.name + suffix).unlink(missing_ok=True)
+
+
+def collect(helper: DBHelper, **kwargs) -> tuple[list, list]:
+    pages, cursors = [], []
+    after = None
+    while True:
+        rows, after = asyncio.run(helper.fetch_page("t", after=after, **kwargs))
+        pages.append(rows)
+        cursors.append(after)
+        if after is None:
+            return pages, cursors
+
+
+def test_single_key_pages(helper):
+    pages, cursors = collect(helper, key="id", columns="id, name", limit=4)
+    assert [[r["id"] for r in p] for p in pages] == [[1, 2, 3, 4], [5, 6, 7, 8], [9, 10]]
+    assert cursors == [4, 8, None]
+
+
+def test_exact_multiple_has_no_empty_last_page(helper):
+    pages, cursors = collect(helper, key="id", limit=5)
+    assert [len(p) for p in pages] == [5, 5]
+    assert cursors == [5, None]
+
+
+def test_descending_with_where(helper):
+    pages, _ = collect(helper, key="id", limit=2, where="grp = ?", params=(1,), descending=True)
+    assert [[r["id"] for r in p] for p in pages] == [[10, 7], [4, 1]]
+
+
+def test_composite_key_cursor(helper):
+    pages, cursors = collect(helper, key=("grp", "id"), columns="grp, id", limit=4)
+    flat = [(r["grp"], r["id"]) for p in pages for r in p]
+    assert flat == sorted((i % 3, i) for i in range(1, 11))
+    assert cursors[0] == flat[3]
+    assert cursors[-1] is None
+
+
+def _stream_stats(helper: DBHelper) -> list[dict]:
+    return [item for item in helper.stats.snapshot() if item["sql"].startswith("SELECT id FROM t")]
+
+
+def test_iter_rows_full_iteration(helper):
+    async def run():
+        return [row["id"] async for row in helper.iter_rows("SELECT id FROM t ORDER BY id", chunk_size=3)]
+
+    assert asyncio.run(run()) == list(range(1, 11))
+    (item,) = _stream_stats(helper)
+    assert item["count"] == 1 and item["errors"] == 0
+
+
+def test_iter_rows_early_close_releases_connection(helper, monkeypatch):
+    opened = []
+    open_stream = helper._open_stream
+
+    def tracking_open():
+        conn = open_stream()
+        opened.append(conn)
+        return conn
+
+    monkeypatch.setattr(helper, "_open_stream", tracking_open)
+
+    async def run():
+        seen = []
+        async with aclosing(helper.iter_rows("SELECT id FROM t ORDER BY id", chunk_size=3)) as rows:
+            async for row in rows:
+                seen.append(row["id"])
+                if len(seen) == 2:
+                    break
+        return seen
+
+    assert asyncio.run(run()) == [1, 2]
+    (conn,) = opened
+    with pytest.raises(sqlite3.ProgrammingError):
+        conn.execute("SELECT 1")
+    (item,) = _stream_stats(helper)
+    assert item["count"] == 1
+    # 读事务已结束，checkpoint 能完整截断 WAL
+    assert "checkpoint" in asyncio.run(helper.maintenance())
@@ -0,0 +1,42 @@
+import pytest
+
+import ww_json
+
+
+@pytest.fixture(params=["orjson", "json"])
+def backend(request, monkeypatch):
+    if request.param == "json":
+        monkeypatch.setattr(ww_json, "orjson", None)
+    elif ww_json.orjson is None:
+        pytest.skip("orjson 未安装")
+    return request.param
+
+
+@pytest.mark.parametrize("wrap", [bytes, bytearray, memoryview, lambda b: b.decode("utf-8")])
+def test_loads_accepts_all_input_types(backend, wrap):
+    assert ww_json.loads(wrap('{"a":[1,"鸣潮"]}'.encode("utf-8"))) == {"a": [1, "鸣潮"]}
+
+
+@pytest.mark.parametrize("wrap", [bytes, bytearray, memoryview])
+def test_loads_ignores_invalid_utf8(backend, wrap):
+    assert ww_json.loads(wrap(b'{"a":"\xff' + "鸣".encode("utf-8") + b'"}')) == {"a": "鸣"}
+
+
+def test_loads_raises_decode_error(backend):
+    with pytest.raises(ww_json.JSONDecodeError):
+        ww_json.loads(b"{bad")
+
+
+def test_dumps_compact_and_non_str_keys(backend):
+    assert ww_json.dumps({"b": 1, "a": "中"}, sort_keys=True) == '{"a":"中","b":1}'
+    assert ww_json.loads(ww_json.dumps({1: "x"})) == {"1": "x"}
+
+
+def test_extract_paths():
+    data = {"data": {"cards": [{"desc": {"id": 1}}, {"other": 2}, {"desc": {"id": 3}}]}}
+    assert ww_json.extract(data, "data.cards[*].desc.id") == [1, 3]
+    assert ww_json.extract(data, "data.cards[-1].desc") == {"id": 3}
+    assert ww_json.extract(data, "data.cards[5]", "缺省") == "缺省"
+    assert ww_json.loads_path(b'{"x":{"y":[0,7]}}', "x.y[1]") == 7
+    with pytest.raises(ValueError):
+        ww_json.extract(data, "data..cards")
@@ -0,0 +1,65 @@
+import asyncio
+import time
+
+import pytest
+
+from ww_kuro_tokens import TokenBucket, TokenPool, TokenPoolExhausted
+
+
+def acquire(pool: TokenPool, max_wait: float = 0.0):
+    return asyncio.run(pool.acquire(max_wait))
+
+
+def test_unlimited_by_default():
+    pool = TokenPool(["a", "a", "", "b"])
+    assert [s.token for s in pool.slots] == ["a", "b"]
+    for _ in range(100):
+        pool.release(acquire(pool))
+    assert all(s["available"] is None for s in pool.snapshot())
+
+
+def test_least_loaded_slot_first():
+    pool = TokenPool(["a", "b"])
+    first = acquire(pool)
+    second = acquire(pool)
+    assert {first.token, second.token} == {"a", "b"}
+    pool.release(second)
+    assert acquire(pool) is second
+
+
+def test_last_healthy_token_never_quarantined():
+    pool = TokenPool(["a", "b"])
+    a, b = pool.slots
+    assert pool.quarantine(a, "401")
+    assert not pool.quarantine(b, "401")
+    assert not b.quarantined(time.monotonic())
+    assert b.failures == 1 and b.last_error == "401"
+    assert acquire(pool) is b
+
+
+def test_falls_back_to_earliest_release_when_all_quarantined():
+    pool = TokenPool(["a", "b"])
+    now = time.monotonic()
+    pool.slots[0].quarantined_until = now + 100
+    pool.slots[1].quarantined_until = now + 50
+    assert acquire(pool) is pool.slots[1]
+
+
+def test_rate_limit_exhausts():
+    pool = TokenPool(["a"], rate=0.01, burst=2)
+    acquire(pool)
+    acquire(pool)
+    with pytest.raises(TokenPoolExhausted):
+        acquire(pool, max_wait=0.05)
+    assert pool.snapshot()[0]["available"] == pytest.approx(0, abs=0.01)
+
+
+def test_bucket_refill_is_capped():
+    bucket = TokenBucket(rate=10, capacity=3)
+    bucket.take()
+    bucket.take()
+    bucket.take()
+    assert not bucket.ready()
+    assert bucket.wait_time() == pytest.approx(0.1)
+    bucket.refill(bucket.updated + 10)
+    assert bucket.tokens == 3
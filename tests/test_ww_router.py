@@ -0,0 +1,73 @@
+import pytest
+from nonebot.adapters.onebot.v11 import GroupMessageEvent, Message, PrivateMessageEvent
+
+from ww_router import PrefixRouter
+
+
+def make_event(text: str, to_me: bool = False, group: bool = True):
+    data = dict(
+        time=0, self_id=1, post_type="message", sub_type="normal", user_id=2,
+        message_type="group" if group else "private", message_id=1,
+        message=Message(text), original_message=Message(text), raw_message=text,
+        font=0, sender={"user_id": 2}, to_me=to_me,
+    )
+    if group:
+        return GroupMessageEvent(group_id=3, **data)
+    data["sub_type"] = "friend"
+    return PrivateMessageEvent(**data)
+
+
+async def handler_a(bot, event, matcher, route):
+    pass
+
+
+async def handler_b(bot, event, matcher, route):
+    pass
+
+
+def test_longest_prefix_wins_and_args():
+    router = PrefixRouter()
+    router.add("ww", handler_a)
+    router.add("ww查看", handler_b)
+    match = router.resolve(make_event("  ww查看 123 "))
+    assert match.route.handler is handler_b
+    assert match.text == "ww查看 123"
+    assert match.args == "123"
+    assert router.resolve(make_event("ww其他")).route.handler is handler_a
+    assert router.resolve(make_event("查看ww")) is None
+    assert router.stats == {"events": 3, "routed": 2}
+
+
+def test_falls_back_to_shorter_prefix_when_pattern_fails():
+    router = PrefixRouter()
+    router.add("ww", handler_a)
+    router.add("wwzxdt", handler_b, pattern=r"^wwzxdt\+(\d{1,20})$")
+    match = router.resolve(make_event("wwzxdt+42"))
+    assert match.route.handler is handler_b
+    assert match.match.group(1) == "42"
+    assert router.resolve(make_event("wwzxdt+abc")).route.handler is handler_a
+
+
+def test_event_type_and_to_me_filters():
+    router = PrefixRouter()
+    router.add("绑定", handler_a, event_type=GroupMessageEvent, to_me=True)
+    assert router.resolve(make_event("绑定 1")) is None
+    assert router.resolve(make_event("绑定 1", to_me=True, group=False)) is None
+    assert router.resolve(make_event("绑定 1", to_me=True)).route.handler is handler_a
+
+
+def test_on_decorator_registers_route():
+    router = PrefixRouter()
+
+    @router.on("ping")
+    async def ping(bot, event, matcher, route):
+        pass
+
+    (route,) = router.routes()
+    assert route.handler is ping
+    assert route.name == "test_ww_router.ping"
+
+
+def test_empty_prefix_rejected():
+    with pytest.raises(ValueError):
+        PrefixRouter().add("", handler_a)
@@ -1,7 +1,6 @@
 from __future__ import annotations
 
 import asyncio
-import json
 import re
 import sys
 import urllib.request
@@ -9,9 +8,10 @@ from datetime import datetime
 from pathlib import Path
 from typing import Any
 
-from nonebot import get_bots, get_driver, on_message, require
+from nonebot import get_bots, get_driver, require
 from nonebot.adapters.onebot.v11 import Bot, MessageEvent, MessageSegment
 from nonebot.log import logger
+from nonebot.matcher import Matcher
 
 current_dir = Path(__file__).parent
 if str(current_dir) not in sys.path:
@@ -25,6 +25,30 @@ except ImportError:
     except ImportError:
         from src.plugins.ww_db_helper import db
 
+try:
+    from ww_json import extract, loads
+except ImportError:
+    try:
+        from .ww_json import extract, loads
+    except ImportError:
+        from src.plugins.ww_json import extract, loads
+
+try:
+    from ww_image_encode import encode_image, parse_formats
+except ImportError:
+    try:
+        from .ww_image_encode import encode_image, parse_formats
+    except ImportError:
+        from src.plugins.ww_image_encode import encode_image, parse_formats
+
+try:
+    from ww_router import RouteMatch, router
+except ImportError:
+    try:
+        from .ww_router import RouteMatch, router
+    except ImportError:
+        from src.plugins.ww_router import RouteMatch, router
+
 require("nonebot_plugin_apscheduler")
 from nonebot_plugin_apscheduler import scheduler
 
@@ -88,7 +112,7 @@ async def _capture_screenshot_retry(dynamic_id: str) -> bytes | None:
     while True:
         img = await _screenshot_dynamic(dynamic_id)
         if isinstance(img, (bytes, bytearray)) and _is_probably_image_bytes(bytes(img)):
-            return bytes(img)
+            return await _encode_screenshot(bytes(img), dynamic_id)
         logger.info(f"bili 截图失败或无效 dynamic_id={dynamic_id} attempt={attempt}")
         if (not retry_forever) and attempt >= attempts:
             return None
@@ -96,6 +120,18 @@ async def _capture_screenshot_retry(dynamic_id: str) -> bytes | None:
         await _sleep_backoff(attempt)
 
 
+async def _encode_screenshot(img: bytes, dynamic_id: str) -> bytes:
+    """整页截图可能很大，按字节预算重新编码后再发送，编码失败时原样发送"""
+    budget = int(float(getattr(driver.config, "ww_bili_image_budget_kb", 1024)) * 1024)
+    formats = parse_formats(getattr(driver.config, "ww_bili_image_formats", ("jpeg", "webp")))
+    try:
+        encoded = await asyncio.to_thread(encode_image, img, budget, formats, f"bili {dynamic_id}")
+        return encoded.data
+    except Exception as e:
+        logger.info(f"bili 截图编码失败 dynamic_id={dynamic_id} err={e}")
+        return img
+
+
 async def _send_with_retry_target(bot: Any, target_type: str, target_id: int, message_builder):
     retry_forever, attempts, _, _ = _retry_settings()
     attempt = 1
@@ -184,7 +220,7 @@ def _http_json(url: str, timeout: int = 15) -> dict:
     )
     with urllib.request.urlopen(req, timeout=timeout) as resp:
         body = resp.read()
-    return json.loads(body.decode("utf-8", errors="ignore"))
+    return loads(body)
 
 
 def _get_latest_dynamic(uid: int) -> tuple[str | None, str | None, int | None]:
@@ -192,30 +228,28 @@ def _get_latest_dynamic(uid: int) -> tuple[str | None, str | None, int | None]:
         url = f"https://api.vc.bilibili.com/dynamic_svr/v1/dynamic_svr/space_history?host_uid={uid}&offset_dynamic_id=0"
         data = _http_json(url)
         if data.get("code") == 0:
-            cards = (data.get("data") or {}).get("cards") or []
-            if cards:
-                def pick(cards_: list[dict]) -> dict:
-                    def is_top(card_: dict) -> bool:
-                        desc_ = card_.get("desc") or {}
+            # 只用到每条动态的 desc，card 中的正文与图片等大字段不再访问
+            descs = [d for d in extract(data, "data.cards[*].desc", []) if isinstance(d, dict)]
+            if descs:
+                def pick(descs_: list[dict]) -> dict:
+                    def is_top(desc_: dict) -> bool:
                         v = desc_.get("is_top")
                         if v is None:
                             v = desc_.get("isTop")
                         return str(v) == "1" or v is True
 
-                    def ts(card_: dict) -> int:
-                        desc_ = card_.get("desc") or {}
+                    def ts(desc_: dict) -> int:
                         v = desc_.get("timestamp")
                         try:
                             return int(v)
                         except Exception:
                             return 0
 
-                    non_top = [c for c in cards_ if not is_top(c)]
-                    cand = non_top if non_top else cards_
+                    non_top = [d for d in descs_ if not is_top(d)]
+                    cand = non_top if non_top else descs_
                     return max(cand, key=ts)
 
-                card = pick(cards)
-                desc = card.get("desc") or {}
+                desc = pick(descs)
                 dynamic_id = str(desc.get("dynamic_id_str") or desc.get("dynamic_id") or "").strip()
                 ts = desc.get("timestamp")
                 profile = ((desc.get("user_profile") or {}).get("info")) or {}
@@ -336,7 +370,8 @@ async def _screenshot_dynamic(dynamic_id: str) -> bytes | None:
                 await page.wait_for_timeout(300)
             except Exception:
                 pass
-            img = await page.screenshot(type="jpeg", quality=80, full_page=True)
+            # 无损截取，由 _encode_screenshot 统一压缩
+            img = await page.screenshot(type="png", full_page=True)
             await context.close()
             await browser.close()
             return img
@@ -395,8 +430,19 @@ async def _set_last_dynamic(uid: int, dynamic_id: str):
     )
 
 
-async def _get_targets() -> list[dict]:
-    return await db.fetch_all("SELECT uid, uname, last_dynamic_id FROM ww_bili_target ORDER BY uid ASC")
+def _list_page_size() -> int:
+    size = int(getattr(driver.config, "ww_bili_list_page_size", 20))
+    return max(1, size)
+
+
+async def _get_targets_page(after_uid: int | None = None, limit: int = 100) -> tuple[list[dict], int | None]:
+    return await db.fetch_page(
+        "ww_bili_target",
+        key="uid",
+        columns="uid, uname, last_dynamic_id",
+        after=after_uid,
+        limit=limit,
+    )
 
 
 async def _get_target_by_uid(uid: int) -> dict | None:
@@ -404,6 +450,7 @@ async def _get_target_by_uid(uid: int) -> dict | None:
 
 
 async def _get_subs_by_uid(uid: int) -> list[dict]:
+    # 单个 up 的订阅很少，一次读完；推送期间不保持读游标
     return await db.fetch_all(
         "SELECT target_type, target_id FROM ww_bili_sub WHERE uid = ?",
         (uid,),
@@ -433,44 +480,17 @@ def _event_target(event: MessageEvent) -> tuple[str, int] | None:
     return None
 
 
-async def _rule_add(event: MessageEvent) -> bool:
-    text = event.get_plaintext().strip()
-    return text.startswith("ww添加目标")
-
-
-async def _rule_list(event: MessageEvent) -> bool:
-    text = event.get_plaintext().strip()
-    return text == "ww查看目标"
-
-
-async def _rule_del(event: MessageEvent) -> bool:
-    text = event.get_plaintext().strip()
-    return text.startswith("ww删除目标")
-
-
-async def _rule_fetch_latest(event: MessageEvent) -> bool:
-    text = event.get_plaintext().strip()
-    return bool(re.match(r"^wwzxdt\+\d{1,20}$", text))
-
-
-ww_add_target = on_message(rule=_rule_add, priority=10, block=True)
-ww_list_target = on_message(rule=_rule_list, priority=10, block=True)
-ww_del_target = on_message(rule=_rule_del, priority=10, block=True)
-ww_fetch_latest = on_message(rule=_rule_fetch_latest, priority=10, block=True)
-
-
-@ww_add_target.handle()
-async def handle_add(bot: Bot, event: MessageEvent):
-    raw = event.get_plaintext().strip()
-    raw = raw.replace("ww添加目标", "", 1).strip()
-    uids = _extract_uids(raw)
+# 文本命令统一由 ww_router 分发，这里只注册前缀与完整格式
+@router.on("ww添加目标")
+async def handle_add(bot: Bot, event: MessageEvent, matcher: Matcher, route: RouteMatch):
+    uids = _extract_uids(route.args)
     if not uids:
-        await ww_add_target.finish("用法：ww添加目标+哔哩哔哩UID（多个用英文逗号分隔）")
+        await matcher.finish("用法：ww添加目标+哔哩哔哩UID（多个用英文逗号分隔）")
         return
 
     tgt = _event_target(event)
     if not tgt:
-        await ww_add_target.finish("无法识别当前会话类型")
+        await matcher.finish("无法识别当前会话类型")
         return
     target_type, target_id = tgt
 
@@ -483,60 +503,57 @@ async def handle_add(bot: Bot, event: MessageEvent):
         await _add_sub(uid, target_type, target_id, getattr(event, "user_id", None))
         added += 1
 
-    await ww_add_target.finish(f"已添加 {added} 个目标")
+    await matcher.finish(f"已添加 {added} 个目标")
+
 
+@router.on("ww查看目标", pattern=r"^ww查看目标(?:\+(\d{1,20}))?$")
+async def handle_list(bot: Bot, event: MessageEvent, matcher: Matcher, route: RouteMatch):
+    after_uid = int(route.match.group(1)) if route.match.group(1) else None
 
-@ww_list_target.handle()
-async def handle_list(bot: Bot, event: MessageEvent):
-    targets = await _get_targets()
+    targets, next_uid = await _get_targets_page(after_uid, _list_page_size())
     if not targets:
-        await ww_list_target.finish("当前没有任何正在侦测的哔哩哔哩用户")
+        if after_uid is None:
+            await matcher.finish("当前没有任何正在侦测的哔哩哔哩用户")
+        else:
+            await matcher.finish("没有更多目标了")
         return
     lines = []
     for t in targets:
         uid = t.get("uid")
         uname = t.get("uname") or "未知"
         lines.append(f"{uid} - {uname}")
-    await ww_list_target.finish("正在侦测的目标：\n" + "\n".join(lines))
+    msg = "正在侦测的目标：\n" + "\n".join(lines)
+    if next_uid is not None:
+        msg += f"\n查看下一页请发送：ww查看目标+{next_uid}"
+    await matcher.finish(msg)
 
 
-@ww_del_target.handle()
-async def handle_del(bot: Bot, event: MessageEvent):
-    raw = event.get_plaintext().strip()
-    raw = raw.replace("ww删除目标", "", 1).strip()
-    uids = _extract_uids(raw)
+@router.on("ww删除目标")
+async def handle_del(bot: Bot, event: MessageEvent, matcher: Matcher, route: RouteMatch):
+    uids = _extract_uids(route.args)
     if not uids:
-        await ww_del_target.finish("用法：ww删除目标+哔哩哔哩UID（多个用英文逗号分隔）")
+        await matcher.finish("用法：ww删除目标+哔哩哔哩UID（多个用英文逗号分隔）")
         return
 
     removed = 0
     for uid in uids:
         await _delete_target(uid)
         removed += 1
-    await ww_del_target.finish(f"已删除 {removed} 个目标")
+    await matcher.finish(f"已删除 {removed} 个目标")
 
 
-@ww_fetch_latest.handle()
-async def handle_fetch_latest(bot: Bot, event: MessageEvent):
-    text = event.get_plaintext().strip()
-    m = re.match(r"^wwzxdt\+(\d{1,20})$", text)
-    if not m:
-        await ww_fetch_latest.finish("用法：wwzxdt+UID")
-        return
-    try:
-        uid = int(m.group(1))
-    except Exception:
-        await ww_fetch_latest.finish("用法：wwzxdt+UID")
-        return
+@router.on("wwzxdt", pattern=r"^wwzxdt\+(\d{1,20})$")
+async def handle_fetch_latest(bot: Bot, event: MessageEvent, matcher: Matcher, route: RouteMatch):
+    uid = int(route.match.group(1))
 
     target = await _get_target_by_uid(uid)
     if not target:
-        await ww_fetch_latest.finish(f"未添加此目标：{uid}")
+        await matcher.finish(f"未添加此目标：{uid}")
         return
 
     dynamic_id, latest_uname, pub_ts = await asyncio.to_thread(_get_latest_dynamic, uid)
     if not dynamic_id:
-        await ww_fetch_latest.finish(f"获取失败：{target.get('uname') or uid}（{uid}）暂无动态或接口不可用")
+        await matcher.finish(f"获取失败：{target.get('uname') or uid}（{uid}）暂无动态或接口不可用")
         return
 
     pub_time = _format_ts(pub_ts) or "未知时间"
@@ -546,18 +563,18 @@ async def handle_fetch_latest(bot: Bot, event: MessageEvent):
 
     if img:
         try:
-            await ww_fetch_latest.finish(MessageSegment.at(event.user_id) + MessageSegment.image(img) + "\n" + title)
+            await matcher.finish(MessageSegment.at(event.user_id) + MessageSegment.image(img) + "\n" + title)
         except Exception as e:
             logger.info(f"bili wwzxdt 图片发送失败，将后台重试 uid={uid} dynamic_id={dynamic_id} err={e}")
             # try:
-            #     # await ww_fetch_latest.finish("截图发送失败，正在重试，成功后补发")
+            #     # await matcher.finish("截图发送失败，正在重试，成功后补发")
             # except Exception:
             #     pass
             async def _task():
                 await _capture_and_send_target(bot, "private", int(event.user_id), dynamic_id, title)
             asyncio.create_task(_task())
     else:
-        await ww_fetch_latest.finish(MessageSegment.at(event.user_id) + "\n" + title)
+        await matcher.finish(MessageSegment.at(event.user_id) + "\n" + title)
 
 
 async def _send_update(uid: int, uname: str | None, dynamic_id: str, pub_time: str | None):
@@ -570,8 +587,7 @@ async def _send_update(uid: int, uname: str | None, dynamic_id: str, pub_time: s
     pub_line = f"🕒 {pub_time}\n" if pub_time else ""
     title = f"哔哩哔哩新动态：{uname or uid}\n{pub_line}{link}"
 
-    subs = await _get_subs_by_uid(uid)
-    for s in subs:
+    for s in await _get_subs_by_uid(uid):
         target_type = s.get("target_type")
         target_id = s.get("target_id")
         try:
@@ -590,32 +606,44 @@ async def poll_bili_dynamic():
     try:
         global _poll_warmup_done
         await _ensure_tables()
-        targets = await _get_targets()
-        logger.info(f"bili 动态轮询开始 targets={len(targets)}")
-        for t in targets:
-            uid = int(t["uid"])
-            last_dynamic_id = t.get("last_dynamic_id")
-            dynamic_id, uname, pub_ts = await asyncio.to_thread(_get_latest_dynamic, uid)
-            if not dynamic_id:
-                logger.info(f"bili 动态轮询 uid={uid} 获取失败")
-                continue
-            if uname:
-                await _upsert_target(uid, uname)
-            if (not last_dynamic_id) and (not _poll_warmup_done):
-                pub_time = _format_ts(pub_ts) or "未知时间"
-                logger.info(f"bili 动态热启动记录 uid={uid} dynamic_id={dynamic_id} pub={pub_time}")
-                await _set_last_dynamic(uid, dynamic_id)
-                continue
-            if (last_dynamic_id != dynamic_id) and _poll_warmup_done:
-                pub_time = _format_ts(pub_ts) or "未知时间"
-                logger.info(f"bili 动态更新 uid={uid} {last_dynamic_id} -> {dynamic_id} pub={pub_time}")
-                await _set_last_dynamic(uid, dynamic_id)
-                await _send_update(uid, uname, dynamic_id, pub_time)
-            else:
-                logger.info(f"bili 动态无更新 uid={uid} dynamic_id={dynamic_id}")
+        logger.info("bili 动态轮询开始")
+        checked = 0
+        after_uid = None
+        while True:
+            # 按 uid 分页读取目标，避免一次性加载整张表，也不在轮询期间长时间占用读游标
+            targets, after_uid = await _get_targets_page(after_uid)
+            for t in targets:
+                checked += 1
+                await _poll_target(t)
+            if after_uid is None:
+                break
+        logger.info(f"bili 动态轮询结束 targets={checked}")
         if not _poll_warmup_done:
             _poll_warmup_done = True
             logger.info("bili 动态热启动完成：后续将正常推送新动态")
     except Exception as e:
         logger.info(f"bili 动态轮询失败 err={e}")
 
+
+async def _poll_target(t: dict):
+    uid = int(t["uid"])
+    last_dynamic_id = t.get("last_dynamic_id")
+    dynamic_id, uname, pub_ts = await asyncio.to_thread(_get_latest_dynamic, uid)
+    if not dynamic_id:
+        logger.info(f"bili 动态轮询 uid={uid} 获取失败")
+        return
+    if uname:
+        await _upsert_target(uid, uname)
+    if (not last_dynamic_id) and (not _poll_warmup_done):
+        pub_time = _format_ts(pub_ts) or "未知时间"
+        logger.info(f"bili 动态热启动记录 uid={uid} dynamic_id={dynamic_id} pub={pub_time}")
+        await _set_last_dynamic(uid, dynamic_id)
+        return
+    if (last_dynamic_id != dynamic_id) and _poll_warmup_done:
+        pub_time = _format_ts(pub_ts) or "未知时间"
+        logger.info(f"bili 动态更新 uid={uid} {last_dynamic_id} -> {dynamic_id} pub={pub_time}")
+        await _set_last_dynamic(uid, dynamic_id)
+        await _send_update(uid, uname, dynamic_id, pub_time)
+    else:
+        logger.info(f"bili 动态无更新 uid={uid} dynamic_id={dynamic_id}")
+
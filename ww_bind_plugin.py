@@ -1,6 +1,5 @@
-from nonebot import on_message
 from nonebot.adapters.onebot.v11 import Bot, GroupMessageEvent, MessageSegment
-from nonebot.rule import to_me
+from nonebot.matcher import Matcher
 import sys
 from pathlib import Path
 from nonebot.log import logger
@@ -19,6 +18,14 @@ except ImportError:
     except ImportError:
         from src.plugins.ww_db_helper import db
 
+try:
+    from ww_router import RouteMatch, router
+except ImportError:
+    try:
+        from .ww_router import RouteMatch, router
+    except ImportError:
+        from src.plugins.ww_router import RouteMatch, router
+
 # 在插件加载时初始化表结构
 # 注意：NoneBot2 插件通常在 import 时执行顶层代码
 # 为了确保表存在，我们需要在 import 时调用建表语句
@@ -39,27 +46,18 @@ async def init_tables():
         )
     """)
 
-async def check_bind_rule(event: GroupMessageEvent) -> bool:
-    """
-    检查规则：
-    1. 用户 @ 机器人
-    2. 消息以 "绑定" 开头
-    """
-    msg = event.get_plaintext().strip()
-    return msg.startswith("绑定")
-
-# 注册消息响应器
-ww_bind_plugin = on_message(rule=to_me() & check_bind_rule, priority=10, block=True)
-
-@ww_bind_plugin.handle()
-async def handle_bind(bot: Bot, event: GroupMessageEvent):
+# 注册到统一路由，触发条件：
+# 1. 群消息且用户 @ 机器人
+# 2. 消息以 "绑定" 开头
+@router.on("绑定", event_type=GroupMessageEvent, to_me=True)
+async def handle_bind(bot: Bot, event: GroupMessageEvent, matcher: Matcher, route: RouteMatch):
     # 解析消息内容
-    msg = event.get_plaintext().strip()
+    msg = route.text
     # 移除 "绑定" 前缀，获取后面的 ID
     game_uid = msg.replace("绑定", "").strip()
     
     if not game_uid:
-        await ww_bind_plugin.finish("请在“绑定”后面附带您的游戏UID，例如：绑定100123456")
+        await matcher.finish("请在“绑定”后面附带您的游戏UID，例如：绑定100123456")
         return
         
     user_id = event.user_id
@@ -84,7 +82,7 @@ async def handle_bind(bot: Bot, event: GroupMessageEvent):
             await db.execute_update(insert_sql, (user_id, game_uid))
             action = "绑定"
             
-        await ww_bind_plugin.finish(MessageSegment.at(user_id) + f"\n✅ {action}成功！\nQQ: {user_id}\nUID: {game_uid}")
+        await matcher.finish(MessageSegment.at(user_id) + f"\n✅ {action}成功！\nQQ: {user_id}\nUID: {game_uid}")
         
     except Exception as e:
         logger.info(f"绑定失败，数据库错误: {str(e)}")
@@ -0,0 +1,167 @@
+from __future__ import annotations
+
+import asyncio
+import hashlib
+import json
+import os
+import sys
+from collections import OrderedDict
+from pathlib import Path
+from typing import Awaitable, Callable
+
+from nonebot import get_driver
+from nonebot.log import logger
+
+current_dir = Path(__file__).parent
+if str(current_dir) not in sys.path:
+    sys.path.append(str(current_dir))
+
+try:
+    from ww_db_helper import _get_stable_data_dir
+except ImportError:
+    try:
+        from .ww_db_helper import _get_stable_data_dir
+    except ImportError:
+        from src.plugins.ww_db_helper import _get_stable_data_dir
+
+try:
+    from ww_card_renderer import RENDERER_VERSION, normalize_card_data
+except ImportError:
+    try:
+        from .ww_card_renderer import RENDERER_VERSION, normalize_card_data
+    except ImportError:
+        from src.plugins.ww_card_renderer import RENDERER_VERSION, normalize_card_data
+
+if __name__ != "ww_card_cache":
+    sys.modules.setdefault("ww_card_cache", sys.modules[__name__])
+
+driver = get_driver()
+
+
+def _config(name: str, default):
+    return getattr(driver.config, name, default)
+
+
+def card_cache_key(data: dict, game_name: str, tag: str = "") -> str | None:
+    """
+    按渲染输入计算内容地址：相同的角色展示数据 + 相同的渲染器版本与编码参数 (tag) 得到同一张图
+    roleList 中与卡片无关的字段变化不会导致重新渲染
+    """
+    card = normalize_card_data(data)
+    if card is None:
+        return None
+    payload = json.dumps(
+        {"v": RENDERER_VERSION, "tag": tag, "game": game_name, "card": card},
+        ensure_ascii=False,
+        sort_keys=True,
+        separators=(",", ":"),
+        default=str,
+    )
+    return hashlib.sha256(payload.encode("utf-8")).hexdigest()
+
+
+class CardImageCache:
+    """
+    渲染结果缓存：内存 LRU (按字节数限制) 为一级，数据目录下的文件为二级
+    文件按键的前两位分目录存放，写入时先写临时文件再原子替换
+    """
+
+    def __init__(self, cache_dir: Path, memory_bytes: int = 16 * 1024 * 1024, disk_max_files: int = 2000):
+        self.cache_dir = cache_dir
+        self.memory_bytes = memory_bytes
+        self.disk_max_files = disk_max_files
+        self._memory: OrderedDict[str, bytes] = OrderedDict()
+        self._memory_size = 0
+        self._puts_since_prune = 0
+        self.stats = {"hits": 0, "disk_hits": 0, "misses": 0, "renders": 0}
+
+    def _path(self, key: str) -> Path:
+        return self.cache_dir / key[:2] / key
+
+    def _remember(self, key: str, image: bytes):
+        old = self._memory.pop(key, None)
+        if old is not None:
+            self._memory_size -= len(old)
+        if len(image) > self.memory_bytes:
+            return
+        self._memory[key] = image
+        self._memory_size += len(image)
+        while self._memory_size > self.memory_bytes and self._memory:
+            _, evicted = self._memory.popitem(last=False)
+            self._memory_size -= len(evicted)
+
+    def _read_sync(self, key: str) -> bytes | None:
+        try:
+            return self._path(key).read_bytes()
+        except FileNotFoundError:
+            return None
+
+    def _write_sync(self, key: str, image: bytes):
+        path = self._path(key)
+        path.parent.mkdir(parents=True, exist_ok=True)
+        tmp = path.with_name(f"{path.name}.{os.getpid()}.tmp")
+        tmp.write_bytes(image)
+        os.replace(tmp, path)
+
+    def _prune_sync(self):
+        """文件数超过上限时按修改时间删除最旧的一批"""
+        files = [p for p in self.cache_dir.glob("*/*") if not p.name.endswith(".tmp")]
+        excess = len(files) - self.disk_max_files
+        if excess <= 0:
+            return
+        files.sort(key=lambda p: p.stat().st_mtime)
+        for p in files[:excess]:
+            p.unlink(missing_ok=True)
+
+    async def get(self, key: str) -> bytes | None:
+        image = self._memory.get(key)
+        if image is not None:
+            self._memory.move_to_end(key)
+            self.stats["hits"] += 1
+            return image
+        image = await asyncio.to_thread(self._read_sync, key)
+        if image is not None:
+            self.stats["disk_hits"] += 1
+            self._remember(key, image)
+        return image
+
+    async def put(self, key: str, image: bytes):
+        self._remember(key, image)
+        try:
+            await asyncio.to_thread(self._write_sync, key, image)
+            self._puts_since_prune += 1
+            if self._puts_since_prune >= 50:
+                self._puts_since_prune = 0
+                await asyncio.to_thread(self._prune_sync)
+        except OSError as e:
+            logger.warning(f"[card] 写入卡片缓存失败 key={key[:12]} err={e}")
+
+    async def get_or_render(
+        self,
+        data: dict,
+        game_name: str,
+        render: Callable[[dict, str], Awaitable[bytes | None]],
+        tag: str = "",
+    ) -> bytes | None:
+        key = card_cache_key(data, game_name, tag)
+        if key is None:
+            return None
+        image = await self.get(key)
+        if image is not None:
+            return image
+        self.stats["misses"] += 1
+        image = await render(data, game_name)
+        self.stats["renders"] += 1
+        if image:
+            await self.put(key, image)
+        return image
+
+    def snapshot(self) -> dict:
+        return {**self.stats, "entries": len(self._memory), "memory_bytes": self._memory_size}
+
+
+card_cache = CardImageCache(
+    _get_stable_data_dir() / "card_cache",
+    memory_bytes=int(float(_config("ww_card_cache_memory_mb", 16)) * 1024 * 1024),
+    disk_max_files=int(_config("ww_card_cache_disk_max", 2000)),
+)
@@ -0,0 +1,233 @@
+from __future__ import annotations
+
+import asyncio
+import logging
+import multiprocessing
+import sys
+from concurrent.futures import Executor, ProcessPoolExecutor, ThreadPoolExecutor
+from functools import lru_cache
+from pathlib import Path
+from typing import Sequence
+
+from PIL import Image, ImageDraw, ImageFont
+
+try:
+    from nonebot.log import logger as nb_logger
+except Exception:
+    nb_logger = None
+
+# 进程池的子进程里 NoneBot 未初始化，get_driver 会失败，此时只作为纯渲染模块使用
+try:
+    from nonebot import get_driver
+    driver = get_driver()
+except Exception:
+    driver = None
+
+_logger = nb_logger or logging.getLogger("ww_card_renderer")
+
+if __name__ != "ww_card_renderer":
+    sys.modules.setdefault("ww_card_renderer", sys.modules[__name__])
+
+current_dir = Path(__file__).parent
+if str(current_dir) not in sys.path:
+    sys.path.append(str(current_dir))
+
+try:
+    from ww_image_encode import encode_image, parse_formats
+except ImportError:
+    try:
+        from .ww_image_encode import encode_image, parse_formats
+    except ImportError:
+        from src.plugins.ww_image_encode import encode_image, parse_formats
+
+# 渲染结果的版本号，修改布局/配色/字体后需要递增 (卡片缓存按它区分)
+RENDERER_VERSION = 1
+
+WIDTH = 860
+ROW_H = 34
+HEADER_H = 110
+MAX_ROLES = 18
+
+BG_COLOR = (240, 248, 255)
+TEXT_COLOR = (0, 0, 0)
+ACCENT_COLOR = (0, 191, 255)
+
+_FONT_CANDIDATES = [
+    ("msyhbd.ttc", "msyh.ttc"),
+    ("NotoSansCJK-Bold.ttc", "NotoSansCJK-Regular.ttc"),
+]
+
+
+def _config(name: str, default):
+    if driver is None:
+        return default
+    return getattr(driver.config, name, default)
+
+
+@lru_cache(maxsize=1)
+def _load_fonts() -> tuple:
+    """加载 (标题, 正文, 小字) 字体，每个进程只加载一次"""
+    for bold, regular in _FONT_CANDIDATES:
+        try:
+            return (
+                ImageFont.truetype(bold, 36),
+                ImageFont.truetype(regular, 22),
+                ImageFont.truetype(regular, 18),
+            )
+        except OSError:
+            continue
+    default = ImageFont.load_default()
+    return default, default, default
+
+
+@lru_cache(maxsize=8)
+def _header(game_name: str) -> Image.Image:
+    """背景与居中标题只与游戏名有关，渲染一次后复用"""
+    font_title, _, _ = _load_fonts()
+    header = Image.new("RGB", (WIDTH, HEADER_H), BG_COLOR)
+    draw = ImageDraw.Draw(header)
+    title = f"{game_name} 阵容信息"
+    bbox = draw.textbbox((0, 0), title, font=font_title)
+    text_w = bbox[2] - bbox[0]
+    draw.text(((WIDTH - text_w) / 2, 24), title, font=font_title, fill=TEXT_COLOR)
+    return header
+
+
+# 卡片上实际用到的角色字段，缓存键只由这些字段决定
+CARD_FIELDS = (
+    "roleName",
+    "level",
+    "starLevel",
+    "breach",
+    "chainUnlockNum",
+    "attributeName",
+    "weaponTypeName",
+    "isMainRole",
+)
+
+
+def normalize_card_data(data: dict) -> dict | None:
+    """提取渲染所需的最小数据：角色总数与前 MAX_ROLES 个角色的展示字段"""
+    roles = data.get("roleList") or []
+    if not isinstance(roles, list) or not roles:
+        return None
+    return {
+        "total": len(roles),
+        "roles": [{f: r.get(f) for f in CARD_FIELDS} for r in roles[:MAX_ROLES]],
+    }
+
+
+def _warm_up():
+    _load_fonts()
+
+
+def render_role_card(
+    data: dict,
+    game_name: str,
+    budget_bytes: int = 0,
+    formats: str | Sequence[str] = ("png8",),
+) -> bytes | None:
+    """
+    同步渲染阵容卡片，并按字节预算编码 (见 ww_image_encode)
+    运行在渲染线程/进程中，不要在事件循环里直接调用
+    """
+    card = normalize_card_data(data)
+    if card is None:
+        return None
+
+    _, font_content, font_small = _load_fonts()
+    roles_view = card["roles"]
+    height = HEADER_H + len(roles_view) * ROW_H + 30
+
+    img = Image.new("RGB", (WIDTH, height), BG_COLOR)
+    img.paste(_header(game_name), (0, 0))
+    draw = ImageDraw.Draw(img)
+
+    draw.text((40, 78), f"角色数: {card['total']}", font=font_small, fill=TEXT_COLOR)
+
+    y = HEADER_H
+    for idx, r in enumerate(roles_view, start=1):
+        role_name = r.get("roleName") or "未知"
+        level = r.get("level")
+        star = r.get("starLevel")
+        breach = r.get("breach")
+        chain = r.get("chainUnlockNum")
+        attr = r.get("attributeName") or ""
+        weapon = r.get("weaponTypeName") or ""
+        is_main = r.get("isMainRole")
+
+        left = f"{idx:02d}. {'[主] ' if is_main else ''}{role_name}"
+        mid = f"Lv.{level if level is not None else '?'}  ★{star if star is not None else '?'}  突破:{breach if breach is not None else '?'}  命座:{chain if chain is not None else '?'}"
+        right = f"{attr} / {weapon}".strip(" /")
+
+        draw.text((40, y), left, font=font_content, fill=ACCENT_COLOR if is_main else TEXT_COLOR)
+        draw.text((320, y), mid, font=font_small, fill=TEXT_COLOR)
+        draw.text((720, y), right, font=font_small, fill=TEXT_COLOR)
+        y += ROW_H
+
+    return encode_image(img, budget_bytes, formats, label=f"card {game_name}").data
+
+
+class CardRenderer:
+    """
+    卡片渲染服务：Pillow 绘制与编码放到线程池或进程池中执行，
+    调用方只 await 结果，不阻塞事件循环
+    - thread：字体与标题在进程内只加载一次，Pillow 绘制期间大部分时间会释放 GIL
+    - process：使用 spawn 启动的子进程，各子进程启动时预加载字体，适合渲染量大的场景
+      spawn 子进程会重新导入启动脚本，bot.py 中的 nonebot.run() 需放在 if __name__ == "__main__" 下
+    """
+
+    def __init__(
+        self,
+        mode: str = "thread",
+        workers: int = 2,
+        budget_bytes: int = 512 * 1024,
+        formats: str | Sequence[str] = ("png8", "webp", "jpeg"),
+    ):
+        self.mode = mode if mode in ("thread", "process") else "thread"
+        self.workers = max(1, int(workers))
+        self.budget_bytes = int(budget_bytes)
+        self.formats = parse_formats(formats)
+        self._executor: Executor | None = None
+
+    @property
+    def cache_tag(self) -> str:
+        """输出编码参数，变化后旧的缓存图片不再命中"""
+        return f"v{RENDERER_VERSION}:{self.budget_bytes}:{','.join(self.formats)}"
+
+    def _get_executor(self) -> Executor:
+        if self._executor is None:
+            if self.mode == "process":
+                self._executor = ProcessPoolExecutor(
+                    max_workers=self.workers,
+                    mp_context=multiprocessing.get_context("spawn"),
+                    initializer=_warm_up,
+                )
+            else:
+                self._executor = ThreadPoolExecutor(max_workers=self.workers, thread_name_prefix="ww_card_render")
+            _logger.info(f"[card] 渲染池已创建 mode={self.mode} workers={self.workers}")
+        return self._executor
+
+    async def render(self, data: dict, game_name: str) -> bytes | None:
+        loop = asyncio.get_running_loop()
+        return await loop.run_in_executor(
+            self._get_executor(), render_role_card, data, game_name, self.budget_bytes, self.formats
+        )
+
+    def shutdown(self):
+        if self._executor is not None:
+            self._executor.shutdown(wait=False, cancel_futures=True)
+            self._executor = None
+
+
+renderer = CardRenderer(
+    _config("ww_card_render_executor", "thread"),
+    _config("ww_card_render_workers", 2),
+    int(float(_config("ww_card_image_budget_kb", 512)) * 1024),
+    _config("ww_card_image_formats", ("png8", "webp", "jpeg")),
+)
+
+if driver is not None:
+    @driver.on_shutdown
+    async def _stop_renderer():
+        renderer.shutdown()
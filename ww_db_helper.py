@@ -1,7 +1,12 @@
+import math
 import sqlite3
 import sys
+import time
+from contextlib import aclosing
 from pathlib import Path
-from nonebot import require
+from typing import Any, AsyncIterator, Callable
+from nonebot import get_driver, require
+from nonebot.log import logger
 from nonebot.utils import run_sync
 
 # 声明依赖
@@ -29,10 +34,120 @@ def _get_stable_data_dir() -> Path:
         data_dir = (project_root / data_dir).resolve()
     return data_dir
 
+def _config(name: str, default):
+    try:
+        return getattr(get_driver().config, name, default)
+    except Exception:
+        return default
+
+def _normalize_sql(sql: str) -> str:
+    return " ".join(sql.split())
+
+def _describe_params(params) -> str:
+    """日志里只记录参数个数与类型，参数值可能包含 QQ 号、token、用户文本"""
+    if not params:
+        return "0"
+    return f"{len(params)}({', '.join(type(p).__name__ for p in params)})"
+
+def _percentile(sorted_values: list[float], q: float) -> float:
+    if not sorted_values:
+        return 0.0
+    idx = min(len(sorted_values) - 1, max(0, math.ceil(q * len(sorted_values)) - 1))
+    return sorted_values[idx]
+
+
+class QueryStats:
+    """
+    按语句聚合的耗时统计
+    - elapsed: 语句在工作线程中的实际执行耗时
+    - wait: 从事件循环提交到工作线程开始执行的等待时间 (线程切换/线程池排队)
+    只在事件循环线程中记录，无需加锁
+    """
+
+    def __init__(self, max_samples: int = 512):
+        self.max_samples = max_samples
+        self._stats: dict[str, dict] = {}
+
+    def record(self, sql: str, elapsed: float, wait: float, error: bool = False):
+        key = _normalize_sql(sql)
+        item = self._stats.get(key)
+        if item is None:
+            item = self._stats[key] = {
+                "count": 0,
+                "errors": 0,
+                "total": 0.0,
+                "max": 0.0,
+                "samples": [],
+                "waits": [],
+                "pos": 0,
+            }
+        item["count"] += 1
+        if error:
+            item["errors"] += 1
+        item["total"] += elapsed
+        item["max"] = max(item["max"], elapsed)
+        # 环形采样，内存占用固定
+        if len(item["samples"]) < self.max_samples:
+            item["samples"].append(elapsed)
+            item["waits"].append(wait)
+        else:
+            item["samples"][item["pos"]] = elapsed
+            item["waits"][item["pos"]] = wait
+            item["pos"] = (item["pos"] + 1) % self.max_samples
+
+    def reset(self):
+        self._stats.clear()
+
+    def snapshot(self) -> list[dict]:
+        """导出统计 (毫秒)，按总耗时倒序"""
+        result = []
+        for sql, item in self._stats.items():
+            samples = sorted(item["samples"])
+            waits = sorted(item["waits"])
+            result.append({
+                "sql": sql,
+                "count": item["count"],
+                "errors": item["errors"],
+                "total_ms": item["total"] * 1000,
+                "max_ms": item["max"] * 1000,
+                "p50_ms": _percentile(samples, 0.50) * 1000,
+                "p95_ms": _percentile(samples, 0.95) * 1000,
+                "p99_ms": _percentile(samples, 0.99) * 1000,
+                "wait_p50_ms": _percentile(waits, 0.50) * 1000,
+                "wait_p95_ms": _percentile(waits, 0.95) * 1000,
+                "wait_p99_ms": _percentile(waits, 0.99) * 1000,
+            })
+        result.sort(key=lambda x: x["total_ms"], reverse=True)
+        return result
+
+    def prometheus_lines(self) -> list[str]:
+        """导出为 Prometheus 文本格式"""
+        def label(value: str) -> str:
+            return value[:200].replace("\\", "\\\\").replace('"', '\\"')
+
+        lines = [
+            "# TYPE ww_db_query_total counter",
+            "# TYPE ww_db_query_errors_total counter",
+            "# TYPE ww_db_query_seconds_total counter",
+            "# TYPE ww_db_query_latency_seconds summary",
+            "# TYPE ww_db_query_wait_seconds summary",
+        ]
+        for item in self.snapshot():
+            sql = label(item["sql"])
+            lines.append(f'ww_db_query_total{{sql="{sql}"}} {item["count"]}')
+            lines.append(f'ww_db_query_errors_total{{sql="{sql}"}} {item["errors"]}')
+            lines.append(f'ww_db_query_seconds_total{{sql="{sql}"}} {item["total_ms"] / 1000:.6f}')
+            for q in ("50", "95", "99"):
+                lines.append(f'ww_db_query_latency_seconds{{sql="{sql}",quantile="0.{q}"}} {item[f"p{q}_ms"] / 1000:.6f}')
+                lines.append(f'ww_db_query_wait_seconds{{sql="{sql}",quantile="0.{q}"}} {item[f"wait_p{q}_ms"] / 1000:.6f}')
+        return lines
+
+
 class DBHelper:
     def __init__(self, db_name="my_plugin_data.db"):
         self.data_dir = _get_stable_data_dir()
         self.db_path = self.data_dir / db_name
+        self.stats = QueryStats(int(_config("ww_db_stats_samples", 512)))
         self._init_db()
 
     def _init_db(self):
@@ -40,28 +155,82 @@ class DBHelper:
         # 确保目录存在
         self.data_dir.mkdir(parents=True, exist_ok=True)
         # 这里不再硬编码建表逻辑，改为由各个插件自行调用 create_table
-        pass
+        try:
+            with sqlite3.connect(self.db_path) as conn:
+                # 新库直接启用增量 vacuum；已有库会在首次维护时转换
+                conn.execute("PRAGMA auto_vacuum = INCREMENTAL")
+                if _config("ww_db_wal", True):
+                    # WAL 为持久设置，读写互不阻塞，由维护任务定期 checkpoint
+                    conn.execute("PRAGMA journal_mode = WAL")
+        except Exception as e:
+            logger.warning(f"[db] 初始化 PRAGMA 失败: {e}")
 
-    @run_sync
-    def create_table(self, table_sql: str):
-        """创建表 (供各插件在启动时调用)"""
+    def _slow_threshold(self) -> float:
+        return float(_config("ww_db_slow_query_ms", 200)) / 1000
+
+    def _explain(self, sql: str, params: tuple) -> str:
+        try:
+            with sqlite3.connect(self.db_path) as conn:
+                rows = conn.execute(f"EXPLAIN QUERY PLAN {sql}", params).fetchall()
+            return " | ".join(str(r[-1]) for r in rows) or "-"
+        except Exception as e:
+            return f"无法获取执行计划: {e}"
+
+    async def _timed(self, sql: str, params: tuple, fn: Callable, *args, explain: bool = True):
+        """
+        在工作线程执行 fn 并记录耗时；慢语句会附带 EXPLAIN QUERY PLAN 记录日志
+        返回 (结果, 执行耗时, 等待耗时)
+        """
+        submitted = time.perf_counter()
+        threshold = self._slow_threshold() if explain else 0
+
+        def job():
+            started = time.perf_counter()
+            try:
+                result = fn(*args)
+            except Exception as e:
+                return None, e, started, time.perf_counter(), None
+            finished = time.perf_counter()
+            plan = None
+            if threshold > 0 and finished - started >= threshold:
+                plan = self._explain(sql, params)
+            return result, None, started, finished, plan
+
+        result, error, started, finished, plan = await run_sync(job)()
+        elapsed = finished - started
+        wait = started - submitted
+        self.stats.record(sql, elapsed, wait, error is not None)
+        if plan is not None:
+            logger.warning(
+                f"[db] 慢查询 {elapsed * 1000:.1f}ms (等待 {wait * 1000:.1f}ms) "
+                f"sql={_normalize_sql(sql)} params={_describe_params(params)} plan={plan}"
+            )
+        if error is not None:
+            raise error
+        return result, elapsed, wait
+
+    def _create_table_sync(self, table_sql: str):
         with sqlite3.connect(self.db_path) as conn:
             cursor = conn.cursor()
             cursor.execute(table_sql)
             conn.commit()
 
-    @run_sync
-    def execute_update(self, sql: str, params: tuple = ()):
-        """执行更新操作 (INSERT, UPDATE, DELETE) - 异步包装"""
+    def _execute_update_sync(self, sql: str, params: tuple):
         with sqlite3.connect(self.db_path) as conn:
             cursor = conn.cursor()
             cursor.execute(sql, params)
             conn.commit()
             return cursor.lastrowid
 
-    @run_sync
-    def fetch_all(self, sql: str, params: tuple = ()):
-        """执行查询操作 (SELECT) - 异步包装"""
+    def _execute_batch_sync(self, statements: list[tuple[str, tuple]]):
+        with sqlite3.connect(self.db_path) as conn:
+            cursor = conn.cursor()
+            for sql, params in statements:
+                cursor.execute(sql, params)
+            conn.commit()
+            return len(statements)
+
+    def _fetch_all_sync(self, sql: str, params: tuple):
         with sqlite3.connect(self.db_path) as conn:
             # 设置 row_factory 可以让结果像字典一样访问
             conn.row_factory = sqlite3.Row
@@ -71,9 +240,7 @@ class DBHelper:
             # 将 sqlite3.Row 对象转换为普通字典列表
             return [dict(row) for row in rows]
 
-    @run_sync
-    def fetch_one(self, sql: str, params: tuple = ()):
-        """执行单条查询 - 异步包装"""
+    def _fetch_one_sync(self, sql: str, params: tuple):
         with sqlite3.connect(self.db_path) as conn:
             conn.row_factory = sqlite3.Row
             cursor = conn.cursor()
@@ -81,5 +248,203 @@ class DBHelper:
             row = cursor.fetchone()
             return dict(row) if row else None
 
+    async def create_table(self, table_sql: str):
+        """创建表 (供各插件在启动时调用)"""
+        await self._timed(table_sql, (), self._create_table_sync, table_sql)
+
+    async def execute_update(self, sql: str, params: tuple = ()):
+        """执行更新操作 (INSERT, UPDATE, DELETE) - 异步包装"""
+        result, _, _ = await self._timed(sql, params, self._execute_update_sync, sql, params)
+        return result
+
+    async def execute_batch(self, statements: list[tuple[str, tuple]]):
+        """在同一个事务中依次执行多条更新语句，任一失败则整体回滚"""
+        if not statements:
+            return 0
+        label = f"<batch> {statements[0][0]}"
+        result, _, _ = await self._timed(label, (), self._execute_batch_sync, statements, explain=False)
+        return result
+
+    async def fetch_all(self, sql: str, params: tuple = ()):
+        """执行查询操作 (SELECT) - 异步包装"""
+        result, _, _ = await self._timed(sql, params, self._fetch_all_sync, sql, params)
+        return result
+
+    async def fetch_one(self, sql: str, params: tuple = ()):
+        """执行单条查询 - 异步包装"""
+        result, _, _ = await self._timed(sql, params, self._fetch_one_sync, sql, params)
+        return result
+
+    def _file_stats_sync(self) -> dict:
+        with sqlite3.connect(self.db_path) as conn:
+            page_size = conn.execute("PRAGMA page_size").fetchone()[0]
+            page_count = conn.execute("PRAGMA page_count").fetchone()[0]
+            freelist = conn.execute("PRAGMA freelist_count").fetchone()[0]
+            auto_vacuum = conn.execute("PRAGMA auto_vacuum").fetchone()[0]
+            journal_mode = conn.execute("PRAGMA journal_mode").fetchone()[0]
+        wal_path = Path(f"{self.db_path}-wal")
+        return {
+            "file_size": self.db_path.stat().st_size if self.db_path.exists() else 0,
+            "wal_size": wal_path.stat().st_size if wal_path.exists() else 0,
+            "page_size": page_size,
+            "page_count": page_count,
+            "freelist_count": freelist,
+            "fragmentation": (freelist / page_count) if page_count else 0.0,
+            "auto_vacuum": auto_vacuum,
+            "journal_mode": journal_mode,
+        }
+
+    def _maintenance_sync(self, vacuum_pages: int, allow_full_vacuum: bool) -> list[str]:
+        steps = []
+        # isolation_level=None：VACUUM 等语句不能在事务内执行
+        conn = sqlite3.connect(self.db_path, isolation_level=None)
+        try:
+            conn.execute("PRAGMA wal_checkpoint(TRUNCATE)")
+            steps.append("checkpoint")
+            auto_vacuum = conn.execute("PRAGMA auto_vacuum").fetchone()[0]
+            if auto_vacuum != 2:
+                if allow_full_vacuum:
+                    # 已有库需要一次完整 VACUUM 才能切换到增量模式
+                    conn.execute("PRAGMA auto_vacuum = INCREMENTAL")
+                    conn.execute("VACUUM")
+                    steps.append("vacuum(full, 切换为增量模式)")
+                else:
+                    steps.append("跳过 vacuum（未启用增量模式）")
+                    logger.info(
+                        "[db] 数据库尚未启用增量 VACUUM；完整 VACUUM 会锁住数据库直到完成，"
+                        "请在维护窗口设置 ww_db_allow_full_vacuum=true 执行一次后再关闭"
+                    )
+            else:
+                # incremental_vacuum 每步只回收一页，execute 只会单步执行，需用 executescript 跑完
+                if vacuum_pages > 0:
+                    conn.executescript(f"PRAGMA incremental_vacuum({int(vacuum_pages)});")
+                else:
+                    conn.executescript("PRAGMA incremental_vacuum;")
+                steps.append("incremental_vacuum")
+            conn.execute("ANALYZE")
+            conn.execute("PRAGMA optimize")
+            steps.append("analyze/optimize")
+            conn.execute("PRAGMA wal_checkpoint(TRUNCATE)")
+        finally:
+            conn.close()
+        return steps
+
+    async def file_stats(self) -> dict:
+        """数据库文件大小、页数与空闲页 (碎片率)"""
+        result, _, _ = await self._timed("<file_stats>", (), self._file_stats_sync, explain=False)
+        return result
+
+    async def maintenance(self, vacuum_pages: int = 0, allow_full_vacuum: bool = False) -> list[str]:
+        """
+        执行维护：WAL checkpoint、增量 vacuum、ANALYZE 与 PRAGMA optimize
+        :param vacuum_pages: 增量 vacuum 每次回收的页数，0 表示回收全部空闲页
+        :param allow_full_vacuum: 旧库尚未启用增量模式时是否允许一次完整 VACUUM
+        :return: 实际执行的步骤
+        """
+        result, _, _ = await self._timed(
+            "<maintenance>", (), self._maintenance_sync, vacuum_pages, allow_full_vacuum, explain=False
+        )
+        return result
+
+    def _open_stream(self) -> sqlite3.Connection:
+        # 流式游标会跨多次 run_sync 调用（可能落在不同线程），
+        # 同一时刻只有一个线程在使用它，因此关闭 check_same_thread
+        conn = sqlite3.connect(self.db_path, check_same_thread=False)
+        conn.row_factory = sqlite3.Row
+        return conn
+
+    async def iter_chunks(self, sql: str, params: tuple = (), chunk_size: int = 200) -> AsyncIterator[list[dict]]:
+        """
+        流式查询：每次从游标取 chunk_size 行，按块产出字典列表
+        注意：迭代期间会保持读事务，不要在循环体内对同一张表做写操作；
+        提前 break 时请用 contextlib.aclosing 包裹以便及时释放连接
+        """
+        conn = await run_sync(self._open_stream)()
+        # 整个流式查询只记一次统计：执行与各次 fetchmany 的耗时累加
+        elapsed_total = 0.0
+        wait_total = 0.0
+        failed = False
+        try:
+            submitted = time.perf_counter()
+
+            def execute():
+                started = time.perf_counter()
+                return conn.execute(sql, params), started, time.perf_counter()
+
+            cursor, started, finished = await run_sync(execute)()
+            elapsed_total += finished - started
+            wait_total += started - submitted
+            while True:
+                submitted = time.perf_counter()
+
+                def fetch():
+                    started_ = time.perf_counter()
+                    return cursor.fetchmany(chunk_size), started_, time.perf_counter()
+
+                rows, started, finished = await run_sync(fetch)()
+                elapsed_total += finished - started
+                wait_total += started - submitted
+                if not rows:
+                    break
+                yield [dict(row) for row in rows]
+        except Exception:
+            failed = True
+            raise
+        finally:
+            self.stats.record(sql, elapsed_total, wait_total, failed)
+            await run_sync(conn.close)()
+
+    async def iter_rows(self, sql: str, params: tuple = (), chunk_size: int = 200) -> AsyncIterator[dict]:
+        """流式查询：逐行产出，内部按块读取；提前 break 时同样需要 aclosing 包裹"""
+        # 关闭本生成器时要连带关闭内部的 iter_chunks，否则连接和读事务会留到垃圾回收
+        async with aclosing(self.iter_chunks(sql, params, chunk_size)) as chunks:
+            async for chunk in chunks:
+                for row in chunk:
+                    yield row
+
+    async def fetch_page(
+        self,
+        table: str,
+        key: str | tuple[str, ...],
+        columns: str = "*",
+        after: Any = None,
+        limit: int = 20,
+        where: str = "",
+        params: tuple = (),
+        descending: bool = False,
+    ) -> tuple[list[dict], Any]:
+        """
+        键集分页 (keyset pagination)：按 key 排序，取 after 之后的 limit 行
+        :param key: 排序键，单列或多列元组（多列用行值比较，末列应唯一）
+        :param columns: 查询列，必须包含 key 中的所有列
+        :param after: 上一页返回的游标，None 表示第一页
+        :param where: 额外过滤条件（不含 WHERE 关键字），参数放在 params
+        :return: (本页行列表, 下一页游标)，没有下一页时游标为 None
+        """
+        keys = (key,) if isinstance(key, str) else tuple(key)
+        direction = "DESC" if descending else "ASC"
+        conditions = [f"({where})"] if where else []
+        args = list(params)
+        if after is not None:
+            after_values = (after,) if len(keys) == 1 and not isinstance(after, (tuple, list)) else tuple(after)
+            cmp = "<" if descending else ">"
+            conditions.append(f"({', '.join(keys)}) {cmp} ({', '.join('?' * len(keys))})")
+            args.extend(after_values)
+        sql = f"SELECT {columns} FROM {table}"
+        if conditions:
+            sql += " WHERE " + " AND ".join(conditions)
+        sql += " ORDER BY " + ", ".join(f"{k} {direction}" for k in keys)
+        # 多取一行用于判断是否还有下一页
+        sql += " LIMIT ?"
+        args.append(int(limit) + 1)
+
+        rows = await self.fetch_all(sql, tuple(args))
+        if len(rows) <= limit:
+            return rows, None
+        rows = rows[:limit]
+        last = rows[-1]
+        cursor = last[keys[0]] if len(keys) == 1 else tuple(last[k] for k in keys)
+        return rows, cursor
+
 # 实例化全局对象，供其他插件引用
 db = DBHelper()
@@ -0,0 +1,125 @@
+from __future__ import annotations
+
+import sys
+import time
+from pathlib import Path
+
+from nonebot import get_driver, on_command, require
+from nonebot.log import logger
+from nonebot.permission import SUPERUSER
+
+current_dir = Path(__file__).parent
+if str(current_dir) not in sys.path:
+    sys.path.append(str(current_dir))
+
+try:
+    from ww_db_helper import db
+except ImportError:
+    try:
+        from .ww_db_helper import db
+    except ImportError:
+        from src.plugins.ww_db_helper import db
+
+require("nonebot_plugin_apscheduler")
+from nonebot_plugin_apscheduler import scheduler
+
+driver = get_driver()
+
+# 保留策略：(表名, 过期条件, 配置项, 默认保留天数)；天数 <= 0 表示不清理
+# 过期条件中的 ? 为 "-N days"，时间列均为 CURRENT_TIMESTAMP 写入的 UTC 时间
+_RETENTION_POLICIES = [
+    # 角色内容未变化时不会刷新 updated_at，因此只清理已不在当前绑定下的旧角色
+    (
+        "user_game_role",
+        "updated_at < datetime('now', ?) AND NOT EXISTS ("
+        "SELECT 1 FROM user_bind b WHERE b.user_id = user_game_role.qq_user_id AND b.game_uid = user_game_role.bind_uid)",
+        "ww_db_retention_role_days",
+        180,
+    ),
+    ("user_game_role_history", "changed_at < datetime('now', ?)", "ww_db_retention_role_history_days", 90),
+    ("user_notes", "created_at < datetime('now', ?)", "ww_db_retention_notes_days", 0),
+    ("ww_kuro_cache", "stored_at < CAST(strftime('%s', 'now', ?) AS REAL)", "ww_db_retention_kuro_cache_days", 2),
+]
+
+
+def _format_size(size: int) -> str:
+    if size >= 1024 * 1024:
+        return f"{size / 1024 / 1024:.2f}MB"
+    return f"{size / 1024:.1f}KB"
+
+
+def _format_stats(stats: dict) -> str:
+    return (
+        f"文件 {_format_size(stats['file_size'])} WAL {_format_size(stats['wal_size'])} "
+        f"页 {stats['page_count']} 空闲页 {stats['freelist_count']} "
+        f"碎片率 {stats['fragmentation'] * 100:.1f}%"
+    )
+
+
+async def _apply_retention() -> list[str]:
+    results = []
+    for table, condition, key, default_days in _RETENTION_POLICIES:
+        days = int(getattr(driver.config, key, default_days))
+        if days <= 0:
+            continue
+        exists = await db.fetch_one("SELECT name FROM sqlite_master WHERE type = 'table' AND name = ?", (table,))
+        if not exists:
+            continue
+        before = await db.fetch_one(f"SELECT COUNT(*) AS n FROM {table}")
+        try:
+            await db.execute_update(f"DELETE FROM {table} WHERE {condition}", (f"-{days} days",))
+        except Exception as e:
+            results.append(f"{table}: 清理失败 {e}")
+            continue
+        after = await db.fetch_one(f"SELECT COUNT(*) AS n FROM {table}")
+        removed = (before or {}).get("n", 0) - (after or {}).get("n", 0)
+        results.append(f"{table}: 清理 {removed} 行（保留 {days} 天）")
+    return results
+
+
+async def run_maintenance() -> str:
+    """执行一次保留策略清理与数据库维护，返回报告文本"""
+    started = time.perf_counter()
+    before = await db.file_stats()
+    retention = await _apply_retention()
+    steps = await db.maintenance(
+        vacuum_pages=int(getattr(driver.config, "ww_db_incremental_vacuum_pages", 0)),
+        allow_full_vacuum=bool(getattr(driver.config, "ww_db_allow_full_vacuum", False)),
+    )
+    after = await db.file_stats()
+    elapsed = time.perf_counter() - started
+
+    lines = ["🧹 数据库维护完成", f"维护前：{_format_stats(before)}", f"维护后：{_format_stats(after)}"]
+    lines.extend(retention)
+    lines.append(f"步骤：{', '.join(steps) or '无'}，耗时 {elapsed:.2f}s")
+    return "\n".join(lines)
+
+
+@scheduler.scheduled_job(
+    "cron",
+    hour=int(getattr(driver.config, "ww_db_maintenance_hour", 4)),
+    minute=int(getattr(driver.config, "ww_db_maintenance_minute", 30)),
+    id="ww_db_maintenance",
+    max_instances=1,
+)
+async def scheduled_maintenance():
+    if not getattr(driver.config, "ww_db_maintenance_enabled", True):
+        return
+    try:
+        report = await run_maintenance()
+        logger.info(report.replace("\n", " | "))
+    except Exception as e:
+        logger.warning(f"数据库维护失败 err={e}")
+
+
+ww_db_maintenance = on_command("ww数据库维护", permission=SUPERUSER, priority=5, block=True)
+
+
+@ww_db_maintenance.handle()
+async def handle_maintenance():
+    try:
+        report = await run_maintenance()
+    except Exception as e:
+        await ww_db_maintenance.finish(f"数据库维护失败：{e}")
+        return
+    await ww_db_maintenance.finish(report)
@@ -0,0 +1,73 @@
+from __future__ import annotations
+
+import sys
+from pathlib import Path
+
+from nonebot import get_driver, on_command
+from nonebot.adapters.onebot.v11 import Message
+from nonebot.params import CommandArg
+from nonebot.permission import SUPERUSER
+
+current_dir = Path(__file__).parent
+if str(current_dir) not in sys.path:
+    sys.path.append(str(current_dir))
+
+try:
+    from ww_db_helper import db
+except ImportError:
+    try:
+        from .ww_db_helper import db
+    except ImportError:
+        from src.plugins.ww_db_helper import db
+
+try:
+    from status_perf import register_metrics_endpoint
+except ImportError:
+    try:
+        from .status_perf import register_metrics_endpoint
+    except ImportError:
+        from src.plugins.status_perf import register_metrics_endpoint
+
+driver = get_driver()
+
+
+def _truncate_sql(sql: str, limit: int = 80) -> str:
+    return sql if len(sql) <= limit else sql[:limit] + "..."
+
+
+ww_db_stats = on_command("ww数据库统计", permission=SUPERUSER, priority=5, block=True)
+
+
+@ww_db_stats.handle()
+async def handle_db_stats(args: Message = CommandArg()):
+    arg = args.extract_plain_text().strip()
+    if arg == "重置":
+        db.stats.reset()
+        await ww_db_stats.finish("数据库统计已重置")
+        return
+
+    top = int(arg) if arg.isdigit() else 10
+    items = db.stats.snapshot()
+    if not items:
+        await ww_db_stats.finish("暂无数据库统计")
+        return
+
+    lines = [f"📊 数据库语句统计（按总耗时前 {min(top, len(items))} 条）"]
+    for item in items[:top]:
+        lines.append(
+            f"{_truncate_sql(item['sql'])}\n"
+            f"  次数 {item['count']}（失败 {item['errors']}） 总计 {item['total_ms']:.1f}ms\n"
+            f"  p50/p95/p99 {item['p50_ms']:.1f}/{item['p95_ms']:.1f}/{item['p99_ms']:.1f}ms"
+            f"  等待p95 {item['wait_p95_ms']:.1f}ms"
+        )
+    await ww_db_stats.finish("\n".join(lines))
+
+
+def _setup_metrics_endpoint():
+    # 默认关闭：端点没有鉴权，会暴露语句文本与耗时；/status 的性能指标端点 (status_metrics_path) 已包含这些数据
+    path = getattr(driver.config, "ww_db_metrics_path", "")
+    if path:
+        register_metrics_endpoint(driver, path, "ww_db_metrics", db.stats.prometheus_lines, "数据库指标")
+
+
+_setup_metrics_endpoint()
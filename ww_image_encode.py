@@ -0,0 +1,165 @@
+from __future__ import annotations
+
+import io
+import logging
+import sys
+import time
+from dataclasses import dataclass
+from typing import Sequence
+
+from PIL import Image, features
+
+try:
+    from nonebot.log import logger as nb_logger
+except Exception:
+    nb_logger = None
+
+_logger = nb_logger or logging.getLogger("ww_image_encode")
+
+if __name__ != "ww_image_encode":
+    sys.modules.setdefault("ww_image_encode", sys.modules[__name__])
+
+# 可选输出格式：png8 为调色板量化后的 PNG，适合纯色/文字为主的图；jpeg/webp 适合截图等照片类图片
+FORMATS = ("png8", "jpeg", "webp")
+_LOSSY_QUALITIES = (85, 75, 65, 55, 45)
+_SCALE_STEP = 0.8
+_MIN_SCALE = 0.4
+
+
+@dataclass
+class EncodedImage:
+    data: bytes
+    format: str
+    width: int
+    height: int
+    # 传入的是已编码字节时为原图大小，传入 PIL 图片时为 None
+    original_size: int | None
+    elapsed_ms: float
+    # 输入图片未压缩的像素字节数 (宽 x 高 x 通道数)，PIL 图片输入时作为节省比例的基准
+    raw_size: int = 0
+
+    @property
+    def size(self) -> int:
+        return len(self.data)
+
+
+def parse_formats(value: str | Sequence[str]) -> tuple[str, ...]:
+    """配置项既可以是 "png8,webp" 这样的字符串，也可以是列表"""
+    if isinstance(value, str):
+        value = value.split(",")
+    return tuple(f.strip().lower() for f in value if f and f.strip())
+
+
+def _available(fmt: str) -> bool:
+    if fmt == "webp":
+        return features.check("webp")
+    return fmt in FORMATS
+
+
+def _encode(img: Image.Image, fmt: str, quality: int) -> bytes:
+    buf = io.BytesIO()
+    if fmt == "png8":
+        if img.mode == "RGBA":
+            pal = img.quantize(colors=256, method=Image.Quantize.FASTOCTREE)
+        else:
+            pal = img.convert("RGB").quantize(colors=256, method=Image.Quantize.MEDIANCUT)
+        pal.save(buf, format="PNG", optimize=True)
+    elif fmt == "jpeg":
+        img.convert("RGB").save(buf, format="JPEG", quality=quality, optimize=True, progressive=True)
+    elif fmt == "webp":
+        img.save(buf, format="WEBP", quality=quality, method=4)
+    else:
+        raise ValueError(f"不支持的图片格式: {fmt}")
+    return buf.getvalue()
+
+
+def _best_quality(img: Image.Image, fmt: str, budget: float) -> bytes:
+    """二分查找能放进预算的最高质量；都放不下时返回最低质量的结果"""
+    qualities = sorted(_LOSSY_QUALITIES)
+    lo, hi = 0, len(qualities) - 1
+    best = None
+    lowest = None
+    while lo <= hi:
+        mid = (lo + hi) // 2
+        data = _encode(img, fmt, qualities[mid])
+        if mid == 0:
+            lowest = data
+        if len(data) <= budget:
+            best = data
+            lo = mid + 1
+        else:
+            hi = mid - 1
+    if best is not None:
+        return best
+    return lowest if lowest is not None else _encode(img, fmt, qualities[0])
+
+
+def _fit(img: Image.Image, formats: list[str], budget: float) -> tuple[bytes, str, Image.Image]:
+    """
+    按偏好顺序寻找第一个能放进预算的编码：
+    有损格式二分查找质量，所有格式都超出时按超出比例估算缩放系数后重试
+    缩放到下限仍不满足时返回最小的结果
+    """
+    scale = 1.0
+    current = img
+    smallest: tuple[bytes, str, Image.Image] | None = None
+    while True:
+        for fmt in formats:
+            data = _encode(current, fmt, 0) if fmt == "png8" else _best_quality(current, fmt, budget)
+            if len(data) <= budget:
+                return data, fmt, current
+            if smallest is None or len(data) < len(smallest[0]):
+                smallest = (data, fmt, current)
+        if scale <= _MIN_SCALE:
+            return smallest
+        # 编码大小约与像素数成正比，按面积比例估算并留一些余量
+        ratio = (budget / len(smallest[0])) ** 0.5 * 0.9
+        scale = max(_MIN_SCALE, scale * min(ratio, _SCALE_STEP))
+        size = (max(1, int(img.width * scale)), max(1, int(img.height * scale)))
+        current = img.resize(size, Image.Resampling.LANCZOS)
+
+
+def encode_image(
+    image: Image.Image | bytes,
+    budget_bytes: int,
+    formats: str | Sequence[str] = FORMATS,
+    label: str = "",
+) -> EncodedImage:
+    """
+    在字节预算内编码图片，并记录节省的字节数与编码耗时
+    :param image: PIL 图片，或已编码的图片字节 (如浏览器截图)
+    :param budget_bytes: 输出大小上限；<= 0 表示不限制，只按首选格式编码
+    :param formats: 按偏好排序的候选格式，取值见 FORMATS；也可以是逗号分隔的字符串
+    CPU 密集，应在线程池/进程池中调用
+    """
+    started = time.perf_counter()
+    original: bytes | None = None
+    if isinstance(image, (bytes, bytearray)):
+        original = bytes(image)
+        image = Image.open(io.BytesIO(original))
+        image.load()
+    if image.mode not in ("RGB", "RGBA"):
+        image = image.convert("RGBA" if "A" in image.getbands() else "RGB")
+    raw_size = image.width * image.height * len(image.getbands())
+
+    candidates = [f for f in parse_formats(formats) if _available(f)] or ["jpeg"]
+    limit = budget_bytes if budget_bytes > 0 else float("inf")
+    data, fmt, final = _fit(image, candidates, limit)
+
+    # 传入已编码字节时以原图大小为基准；PIL 图片不为了统计额外编码一次，以未压缩像素大小为基准
+    original_size = len(original) if original is not None else None
+    if original is not None and len(original) <= min(len(data), limit):
+        # 原图已在预算内且更小，不做无意义的重新编码
+        data, fmt, final = original, (Image.open(io.BytesIO(original)).format or "").lower(), image
+
+    elapsed_ms = (time.perf_counter() - started) * 1000
+    result = EncodedImage(data, fmt, final.width, final.height, original_size, elapsed_ms, raw_size)
+    baseline, basis = (original_size, "原图") if original_size is not None else (raw_size, "未压缩")
+    saved = baseline - result.size
+    _logger.info(
+        f"[image] {label} {fmt} {final.width}x{final.height} {basis} {baseline} -> {result.size} bytes "
+        f"(节省 {saved / max(baseline, 1) * 100:.1f}%) 耗时 {elapsed_ms:.1f}ms"
+    )
+    if result.size > limit:
+        _logger.warning(f"[image] {label} 缩放到下限后仍超出预算 {result.size} > {budget_bytes} bytes")
+    return result
@@ -0,0 +1,151 @@
+from __future__ import annotations
+
+import json
+import re
+import sys
+from typing import Any
+
+# orjson 可选：未安装时回退到标准库，接口与行为保持一致
+try:
+    import orjson
+except ImportError:
+    orjson = None
+
+if __name__ != "ww_json":
+    sys.modules.setdefault("ww_json", sys.modules[__name__])
+
+# orjson.JSONDecodeError 是 json.JSONDecodeError 的子类，调用方统一捕获这个即可
+JSONDecodeError = json.JSONDecodeError
+
+BACKEND = "orjson" if orjson is not None else "json"
+
+_MISSING = object()
+_PATH_TOKEN = re.compile(r"([^.\[\]]+)|\[(\*|-?\d+)\]")
+
+
+def loads(data: bytes | bytearray | memoryview | str) -> Any:
+    """
+    解析 JSON，优先直接从 bytes 解码，避免先 decode 成 str 再解析
+    orjson 对非法 UTF-8 会报错，此时按 errors="ignore" 清洗后用标准库重试 (与旧实现的容错一致)
+    """
+    if orjson is not None:
+        try:
+            return orjson.loads(data)
+        except orjson.JSONDecodeError:
+            if isinstance(data, str):
+                raise
+    # 标准库只接受 str / bytes / bytearray，memoryview 需先转换
+    if isinstance(data, (memoryview, bytearray)):
+        data = bytes(data)
+    try:
+        return json.loads(data)
+    except UnicodeDecodeError:
+        return json.loads(data.decode("utf-8", errors="ignore"))
+
+
+def dumps(obj: Any, sort_keys: bool = False) -> str:
+    """紧凑输出，保留中文字符"""
+    if orjson is not None:
+        option = orjson.OPT_SORT_KEYS if sort_keys else 0
+        try:
+            return orjson.dumps(obj, option=option).decode("utf-8")
+        except TypeError:
+            # orjson 不支持的类型 (如非 str 键) 交给标准库处理
+            pass
+    return json.dumps(obj, ensure_ascii=False, separators=(",", ":"), sort_keys=sort_keys, default=str)
+
+
+def _parse_path(path: str) -> list[str | int]:
+    tokens: list[str | int] = []
+    pos = 0
+    for m in _PATH_TOKEN.finditer(path):
+        gap = path[pos:m.start()]
+        if gap not in ("", "."):
+            raise ValueError(f"无效的路径: {path}")
+        pos = m.end()
+        key, index = m.groups()
+        if key is not None:
+            tokens.append(key)
+        elif index == "*":
+            tokens.append("*")
+        else:
+            tokens.append(int(index))
+    if path[pos:]:
+        raise ValueError(f"无效的路径: {path}")
+    return tokens
+
+
+def _walk(obj: Any, tokens: list[str | int]) -> Any:
+    for i, tok in enumerate(tokens):
+        if tok == "*":
+            if not isinstance(obj, list):
+                return _MISSING
+            rest = tokens[i + 1:]
+            results = []
+            for item in obj:
+                value = _walk(item, rest)
+                if value is not _MISSING:
+                    results.append(value)
+            return results
+        if isinstance(tok, int):
+            if not isinstance(obj, list) or not -len(obj) <= tok < len(obj):
+                return _MISSING
+            obj = obj[tok]
+        else:
+            if not isinstance(obj, dict) or tok not in obj:
+                return _MISSING
+            obj = obj[tok]
+    return obj
+
+
+def extract(obj: Any, path: str, default: Any = None) -> Any:
+    """
+    按路径取出子树，例如 "data.cards[*].desc"、"data.items[0].modules"
+    [*] 展开列表并返回各元素的结果列表 (缺失的元素跳过)，其余路径缺失时返回 default
+    """
+    value = _walk(obj, _parse_path(path))
+    return default if value is _MISSING else value
+
+
+def loads_path(data: bytes | bytearray | memoryview | str, path: str, default: Any = None) -> Any:
+    """解析后只保留需要的子树，大响应的其余部分可以尽早释放"""
+    return extract(loads(data), path, default)
+
+
+def _benchmark():
+    """对比旧路径 (bytes -> str -> json.loads -> 手动取值) 与本模块的解析与取子树耗时"""
+    import timeit
+
+    card = json.dumps({"item": {"content": "鸣潮" * 200, "pictures": [{"img_src": "https://i0.hdslb.com/x.jpg"}] * 9}})
+    payload = {
+        "code": 0,
+        "data": {
+            "cards": [
+                {
+                    "desc": {"dynamic_id_str": str(10 ** 17 + i), "timestamp": 1700000000 + i, "is_top": 0},
+                    "card": card,
+                    "display": {"emoji_info": {"emoji_details": [{"text": f"[表情{j}]"} for j in range(30)]}},
+                }
+                for i in range(20)
+            ]
+        },
+    }
+    body = json.dumps(payload, ensure_ascii=False).encode("utf-8")
+
+    def old_path():
+        data = json.loads(body.decode("utf-8", errors="ignore"))
+        return [c.get("desc") for c in (data.get("data") or {}).get("cards") or []]
+
+    def new_path():
+        return loads_path(body, "data.cards[*].desc", [])
+
+    assert old_path() == new_path()
+    number = 200
+    print(f"payload {len(body) / 1024:.1f}KB, backend={BACKEND}, {number} 次")
+    for name, fn in (("json.loads(decode)", old_path), ("ww_json.loads_path", new_path)):
+        best = min(timeit.repeat(fn, number=number, repeat=5)) / number
+        print(f"{name:<22} {best * 1e6:9.1f} us/次")
+
+
+if __name__ == "__main__":
+    _benchmark()
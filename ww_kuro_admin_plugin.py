@@ -0,0 +1,74 @@
+from __future__ import annotations
+
+import sys
+from pathlib import Path
+
+from nonebot import on_command
+from nonebot.adapters.onebot.v11 import Message
+from nonebot.params import CommandArg
+from nonebot.permission import SUPERUSER
+
+current_dir = Path(__file__).parent
+if str(current_dir) not in sys.path:
+    sys.path.append(str(current_dir))
+
+try:
+    from wwSrcoe import kuro_stats, tracer
+except ImportError:
+    try:
+        from .wwSrcoe import kuro_stats, tracer
+    except ImportError:
+        from src.plugins.wwSrcoe import kuro_stats, tracer
+
+
+ww_kuro_stats = on_command("ww接口统计", permission=SUPERUSER, priority=5, block=True)
+
+
+@ww_kuro_stats.handle()
+async def handle_kuro_stats():
+    stats = kuro_stats()
+    cache = stats["cache"]
+    coalesce = stats["coalesce"]
+    lookups = cache["hits"] + cache["stale_hits"] + cache["misses"]
+    hit_rate = (cache["hits"] + cache["stale_hits"]) / lookups * 100 if lookups else 0.0
+    calls = coalesce["leaders"] + coalesce["collapsed"]
+    lines = [
+        "📡 Kuro 接口统计",
+        f"缓存：命中 {cache['hits']} 过期命中 {cache['stale_hits']} 未命中 {cache['misses']}（命中率 {hit_rate:.1f}%）",
+        f"缓存：磁盘命中 {cache['disk_hits']} 后台刷新 {cache['refreshes']} 条目 {cache['entries']}"
+        f"（{cache['memory_bytes'] / 1024:.1f}KB）",
+        f"请求合并：实际请求 {coalesce['leaders']} 被合并 {coalesce['collapsed']}（共 {calls} 次调用）进行中 {coalesce['inflight']}",
+    ]
+    trace = stats["trace"]
+    lines.append(
+        f"请求追踪：已记录 {trace['traced']} 采样输出 {trace['sampled']}（采样率 {trace['sample_rate']}）"
+        f"缓冲区 {trace['buffered']} 条"
+    )
+    for t in stats["tokens"]:
+        state = f"隔离中 {t['quarantine_left']:.0f}s（{t['last_error']}）" if t["quarantine_left"] > 0 else "可用"
+        lines.append(
+            f"token {t['token']}：{state} 请求 {t['requests']} 失败 {t['failures']} "
+            f"进行中 {t['inflight']} 剩余配额 {'不限速' if t['available'] is None else t['available']}"
+        )
+    await ww_kuro_stats.finish("\n".join(lines))
+
+
+ww_kuro_trace = on_command("ww接口追踪", permission=SUPERUSER, priority=5, block=True)
+
+# 单条消息最多输出的追踪条数，避免一次把整个缓冲区刷出来
+_TRACE_MAX_LIMIT = 20
+
+
+@ww_kuro_trace.handle()
+async def handle_kuro_trace(args: Message = CommandArg()):
+    arg = args.extract_plain_text().strip()
+    if arg == "清空":
+        tracer.clear()
+        await ww_kuro_trace.finish("已清空请求追踪缓冲区")
+        return
+    limit = min(max(int(arg), 1), _TRACE_MAX_LIMIT) if arg.isdigit() else 5
+    traces = tracer.dump(limit, body_limit=500)
+    if not traces:
+        await ww_kuro_trace.finish("请求追踪缓冲区为空")
+        return
+    await ww_kuro_trace.finish(f"🔍 最近 {len(traces)} 条 Kuro 请求\n" + "\n\n".join(traces))
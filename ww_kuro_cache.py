@@ -0,0 +1,173 @@
+from __future__ import annotations
+
+import hashlib
+import json
+import sys
+import time
+from collections import OrderedDict
+from dataclasses import dataclass
+from pathlib import Path
+from urllib.parse import urlsplit
+
+import httpx
+
+# 添加当前文件所在目录到 sys.path，确保能找到同级模块
+current_dir = Path(__file__).parent
+if str(current_dir) not in sys.path:
+    sys.path.append(str(current_dir))
+
+try:
+    from ww_json import loads
+except ImportError:
+    try:
+        from .ww_json import loads
+    except ImportError:
+        from src.plugins.ww_json import loads
+
+# SQLite 持久层可选：脱离 NoneBot 单独使用 wwSrcoe 时只保留内存层
+try:
+    try:
+        from ww_db_helper import db
+    except ImportError:
+        try:
+            from .ww_db_helper import db
+        except ImportError:
+            from src.plugins.ww_db_helper import db
+except Exception:
+    db = None
+
+if __name__ != "ww_kuro_cache":
+    sys.modules.setdefault("ww_kuro_cache", sys.modules[__name__])
+
+# 各接口默认缓存时间 (秒)，不在表中的接口不缓存
+DEFAULT_TTLS = {
+    "/user/role/findUserDefaultRole": 600,
+    "/aki/roleBox/akiBox/roleData": 1800,
+}
+
+
+@dataclass
+class CachedResponse:
+    status_code: int
+    content_type: str
+    content: bytes
+    stored_at: float
+
+    def age(self) -> float:
+        return time.time() - self.stored_at
+
+    def to_response(self, method: str, url: str) -> httpx.Response:
+        return httpx.Response(
+            self.status_code,
+            headers={"Content-Type": self.content_type},
+            content=self.content,
+            request=httpx.Request(method, url),
+        )
+
+
+def cache_key(url: str, method: str, data: dict | None) -> str:
+    body = json.dumps(data or {}, sort_keys=True, ensure_ascii=False, default=str)
+    return hashlib.sha256(f"{method.upper()} {url}\n{body}".encode("utf-8")).hexdigest()
+
+
+def is_cacheable(resp: httpx.Response) -> bool:
+    """只缓存业务成功的响应，失败或限流结果不应被复用"""
+    if resp.status_code != 200:
+        return False
+    try:
+        payload = loads(resp.content)
+    except Exception:
+        return False
+    return isinstance(payload, dict) and bool(payload.get("success"))
+
+
+class KuroResponseCache:
+    """
+    Kuro 接口响应缓存：内存 LRU 为一级，SQLite 为二级
+    过期后在 stale 窗口内仍可返回旧结果，由调用方在后台刷新
+    """
+
+    def __init__(self, max_entries: int = 512):
+        self.max_entries = max_entries
+        self._memory: OrderedDict[str, CachedResponse] = OrderedDict()
+        self._table_ready = False
+        self.stats = {"hits": 0, "stale_hits": 0, "misses": 0, "disk_hits": 0, "stores": 0, "refreshes": 0}
+
+    def ttl_for(self, url: str, overrides: dict | None = None) -> float:
+        path = urlsplit(url).path
+        ttls = {**DEFAULT_TTLS, **(overrides or {})}
+        return float(ttls.get(path, 0))
+
+    async def _ensure_table(self):
+        if self._table_ready or db is None:
+            return
+        await db.create_table("""
+            CREATE TABLE IF NOT EXISTS ww_kuro_cache (
+                cache_key TEXT PRIMARY KEY,
+                url TEXT,
+                status_code INTEGER,
+                content_type TEXT,
+                content BLOB,
+                stored_at REAL
+            )
+        """)
+        self._table_ready = True
+
+    def _remember(self, key: str, entry: CachedResponse):
+        self._memory[key] = entry
+        self._memory.move_to_end(key)
+        while len(self._memory) > self.max_entries:
+            self._memory.popitem(last=False)
+
+    async def get(self, key: str, max_age: float) -> CachedResponse | None:
+        """读取缓存，超过 max_age (含 stale 窗口) 的条目视为不存在"""
+        entry = self._memory.get(key)
+        if entry is not None:
+            self._memory.move_to_end(key)
+        elif db is not None:
+            await self._ensure_table()
+            row = await db.fetch_one(
+                "SELECT status_code, content_type, content, stored_at FROM ww_kuro_cache WHERE cache_key = ?",
+                (key,),
+            )
+            if row:
+                entry = CachedResponse(
+                    int(row["status_code"]),
+                    row.get("content_type") or "application/json",
+                    bytes(row["content"]),
+                    float(row["stored_at"]),
+                )
+                self.stats["disk_hits"] += 1
+                self._remember(key, entry)
+        if entry is None or entry.age() >= max_age:
+            return None
+        return entry
+
+    def put_memory(self, key: str, resp: httpx.Response) -> CachedResponse:
+        entry = CachedResponse(
+            resp.status_code,
+            resp.headers.get("Content-Type", "application/json"),
+            resp.content,
+            time.time(),
+        )
+        self._remember(key, entry)
+        self.stats["stores"] += 1
+        return entry
+
+    async def persist(self, key: str, url: str, entry: CachedResponse):
+        if db is None:
+            return
+        await self._ensure_table()
+        await db.execute_update(
+            "INSERT INTO ww_kuro_cache (cache_key, url, status_code, content_type, content, stored_at) "
+            "VALUES (?, ?, ?, ?, ?, ?) ON CONFLICT(cache_key) DO UPDATE SET "
+            "url=excluded.url, status_code=excluded.status_code, content_type=excluded.content_type, "
+            "content=excluded.content, stored_at=excluded.stored_at",
+            (key, url, entry.status_code, entry.content_type, entry.content, entry.stored_at),
+        )
+
+    def memory_size(self) -> int:
+        return sum(len(e.content) for e in self._memory.values())
+
+    def snapshot(self) -> dict:
+        return {**self.stats, "entries": len(self._memory), "memory_bytes": self.memory_size()}
@@ -0,0 +1,147 @@
+from __future__ import annotations
+
+import asyncio
+import sys
+import time
+from dataclasses import dataclass, field
+
+if __name__ != "ww_kuro_tokens":
+    sys.modules.setdefault("ww_kuro_tokens", sys.modules[__name__])
+
+
+class TokenPoolExhausted(RuntimeError):
+    """所有 token 都在隔离中或在等待时间内没有可用配额"""
+
+
+@dataclass
+class TokenBucket:
+    """令牌桶：每秒补充 rate 个配额，最多累积 capacity 个；rate <= 0 表示不限速"""
+
+    rate: float
+    capacity: float
+    tokens: float = 0.0
+    updated: float = field(default_factory=time.monotonic)
+
+    def __post_init__(self):
+        self.tokens = self.capacity
+
+    @property
+    def limited(self) -> bool:
+        return self.rate > 0
+
+    def refill(self, now: float):
+        if self.limited:
+            self.tokens = min(self.capacity, self.tokens + (now - self.updated) * self.rate)
+        self.updated = now
+
+    def ready(self) -> bool:
+        return not self.limited or self.tokens >= 1
+
+    def take(self):
+        if self.limited:
+            self.tokens -= 1
+
+    def wait_time(self) -> float:
+        if self.ready():
+            return 0.0
+        return (1 - self.tokens) / self.rate
+
+
+@dataclass
+class TokenSlot:
+    token: str
+    bucket: TokenBucket
+    inflight: int = 0
+    requests: int = 0
+    failures: int = 0
+    quarantined_until: float = 0.0
+    last_error: str | None = None
+
+    def quarantined(self, now: float) -> bool:
+        return now < self.quarantined_until
+
+
+class TokenPool:
+    """
+    多 token 池：每个 token 独立限速 (默认不限速)，按负载最低优先选择
+    返回鉴权失败或限流的 token 会被隔离一段时间，但最后一个未隔离的 token 不会被隔离；
+    万一全部处于隔离中，则退回到最早解除隔离的那个
+    """
+
+    def __init__(self, tokens: list[str], rate: float = 0.0, burst: float = 5, quarantine_seconds: float = 600):
+        unique = list(dict.fromkeys(t for t in tokens if t))
+        self.slots = [TokenSlot(t, TokenBucket(rate, burst)) for t in unique]
+        self.quarantine_seconds = quarantine_seconds
+
+    def _pick(self, now: float) -> TokenSlot | None:
+        best = None
+        healthy = False
+        for slot in self.slots:
+            if slot.quarantined(now):
+                continue
+            healthy = True
+            slot.bucket.refill(now)
+            if not slot.bucket.ready():
+                continue
+            # 进行中请求少者优先，其次剩余配额多者优先
+            if best is None or (slot.inflight, -slot.bucket.tokens) < (best.inflight, -best.bucket.tokens):
+                best = slot
+        if not healthy and self.slots:
+            # 全部隔离中：不拒绝请求，使用最早解除隔离的 token
+            best = min(self.slots, key=lambda s: s.quarantined_until)
+            best.bucket.refill(now)
+            if not best.bucket.ready():
+                return None
+        return best
+
+    def _next_ready(self, now: float) -> float:
+        waits = []
+        for slot in self.slots:
+            slot.bucket.refill(now)
+            waits.append(slot.bucket.wait_time())
+        return min(waits) if waits else float("inf")
+
+    async def acquire(self, max_wait: float = 15.0) -> TokenSlot:
+        deadline = time.monotonic() + max_wait
+        while True:
+            now = time.monotonic()
+            slot = self._pick(now)
+            if slot is not None:
+                slot.bucket.take()
+                slot.inflight += 1
+                slot.requests += 1
+                return slot
+            wait = self._next_ready(now)
+            if now + wait > deadline:
+                raise TokenPoolExhausted("Kuro token 池暂无可用 token（全部限流中）")
+            await asyncio.sleep(max(wait, 0.01))
+
+    def release(self, slot: TokenSlot):
+        slot.inflight = max(0, slot.inflight - 1)
+
+    def quarantine(self, slot: TokenSlot, reason: str) -> bool:
+        """隔离 token，返回是否真的隔离了 (最后一个未隔离的 token 只记录失败)"""
+        now = time.monotonic()
+        slot.failures += 1
+        slot.last_error = reason
+        if not any(s is not slot and not s.quarantined(now) for s in self.slots):
+            return False
+        slot.quarantined_until = now + self.quarantine_seconds
+        return True
+
+    def snapshot(self, redact=lambda t: t) -> list[dict]:
+        now = time.monotonic()
+        result = []
+        for slot in self.slots:
+            if not slot.quarantined(now):
+                slot.bucket.refill(now)
+            result.append({
+                "token": redact(slot.token),
+                "inflight": slot.inflight,
+                "requests": slot.requests,
+                "failures": slot.failures,
+                "available": round(slot.bucket.tokens, 2) if slot.bucket.limited else None,
+                "quarantine_left": max(0.0, slot.quarantined_until - now),
+                "last_error": slot.last_error,
+            })
+        return result
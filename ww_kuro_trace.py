@@ -0,0 +1,146 @@
+from __future__ import annotations
+
+import logging
+import random
+import sys
+import time
+from collections import deque
+from dataclasses import dataclass, field
+from typing import Callable
+
+if __name__ != "ww_kuro_trace":
+    sys.modules.setdefault("ww_kuro_trace", sys.modules[__name__])
+
+_LEVELS = {"TRACE": 5, "DEBUG": 10, "INFO": 20, "SUCCESS": 25, "WARNING": 30, "ERROR": 40, "CRITICAL": 50}
+
+
+def level_no(level: int | str) -> int:
+    if isinstance(level, int):
+        return level
+    return _LEVELS.get(str(level).upper(), 20)
+
+
+@dataclass
+class TraceAttempt:
+    token: str | None
+    started: float
+    elapsed_ms: float = 0.0
+    status: int | None = None
+    error: str | None = None
+
+
+@dataclass
+class RequestTrace:
+    """
+    一次 send_kuro_request 的完整记录，只保存原始对象的引用，
+    格式化 (脱敏、解码响应体) 推迟到真正输出时
+    """
+
+    method: str
+    url: str
+    data: dict | None
+    started_at: float = field(default_factory=time.time)
+    started: float = field(default_factory=time.perf_counter)
+    attempts: list[TraceAttempt] = field(default_factory=list)
+    status: int | None = None
+    content: bytes | None = None
+    error: str | None = None
+    elapsed_ms: float = 0.0
+
+    def begin_attempt(self, token: str | None) -> TraceAttempt:
+        attempt = TraceAttempt(token, time.perf_counter())
+        self.attempts.append(attempt)
+        return attempt
+
+    def end_attempt(self, attempt: TraceAttempt, status: int | None = None, error: str | None = None):
+        attempt.elapsed_ms = (time.perf_counter() - attempt.started) * 1000
+        attempt.status = status
+        attempt.error = error
+
+    def finish(self, status: int | None = None, content: bytes | None = None, error: str | None = None):
+        self.elapsed_ms = (time.perf_counter() - self.started) * 1000
+        self.status = status
+        self.content = content
+        self.error = error
+
+    def summary(self, redact: Callable[[str | None], str | None]) -> str:
+        tokens = ",".join(str(redact(a.token)) for a in self.attempts)
+        result = f"status={self.status}" if self.error is None else f"error={self.error}"
+        return (
+            f"[kuro] {self.method} {self.url} {result} attempts={len(self.attempts)} "
+            f"elapsed={self.elapsed_ms:.0f}ms tokens={tokens}"
+        )
+
+    def format(self, redact: Callable[[str | None], str | None], body_limit: int = 2000) -> str:
+        started = time.strftime("%Y-%m-%d %H:%M:%S", time.localtime(self.started_at))
+        lines = [f"{started} {self.summary(redact)}", f"  data={self.data}"]
+        for i, a in enumerate(self.attempts, start=1):
+            outcome = f"status={a.status}" if a.error is None else f"error={a.error}"
+            lines.append(f"  #{i} token={redact(a.token)} {outcome} {a.elapsed_ms:.0f}ms")
+        if self.content is not None:
+            text = self.content[:body_limit].decode("utf-8", errors="replace")
+            if len(self.content) > body_limit:
+                text += f"...(truncated,{len(self.content)} bytes)"
+            lines.append(f"  body={text}")
+        return "\n".join(lines)
+
+
+class RequestTracer:
+    """
+    请求追踪：
+    - 每个请求的完整记录都进入固定长度的环形缓冲区，按需导出
+    - 日志按采样率输出完整记录，其余请求只在 DEBUG 级别输出摘要
+    - 格式化只在日志级别允许时进行，不会为被丢弃的日志解码响应体
+    """
+
+    def __init__(
+        self,
+        logger,
+        capacity: int = 50,
+        sample_rate: float = 0.0,
+        body_limit: int = 2000,
+        min_level: int | str = "INFO",
+        redact: Callable[[str | None], str | None] = lambda t: t,
+    ):
+        self.logger = logger
+        self.sample_rate = sample_rate
+        self.body_limit = body_limit
+        self.min_level = level_no(min_level)
+        self.redact = redact
+        self.traces: deque[RequestTrace] = deque(maxlen=max(1, capacity))
+        self.stats = {"traced": 0, "sampled": 0}
+
+    def enabled(self, level: str) -> bool:
+        return level_no(level) >= self.min_level
+
+    def _log(self, level: str, build: Callable[[], str]):
+        if not self.enabled(level):
+            return
+        message = build()
+        if isinstance(self.logger, logging.Logger):
+            self.logger.log(level_no(level), message)
+        else:
+            self.logger.log(level, message)
+
+    def start(self, method: str, url: str, data: dict | None) -> RequestTrace:
+        return RequestTrace(method, url, data)
+
+    def record(self, trace: RequestTrace):
+        self.traces.append(trace)
+        self.stats["traced"] += 1
+        if self.sample_rate > 0 and random.random() < self.sample_rate:
+            self.stats["sampled"] += 1
+            self._log("INFO", lambda: trace.format(self.redact, self.body_limit))
+        else:
+            self._log("DEBUG", lambda: trace.summary(self.redact))
+
+    def recent(self, limit: int | None = None) -> list[RequestTrace]:
+        traces = list(self.traces)
+        return traces[-limit:] if limit else traces
+
+    def dump(self, limit: int | None = None, body_limit: int | None = None) -> list[str]:
+        body_limit = self.body_limit if body_limit is None else body_limit
+        return [t.format(self.redact, body_limit) for t in self.recent(limit)]
+
+    def clear(self):
+        self.traces.clear()
@@ -33,6 +33,10 @@ async def init_demo_tables():
             created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP
         )
     """)
+    # 支撑按时间倒序分页的索引 (created_at, id)
+    await db.create_table("""
+        CREATE INDEX IF NOT EXISTS idx_user_notes_created_at ON user_notes (created_at, id)
+    """)
 
 # 定义命令
 add_note = on_command("记录", priority=5)
@@ -59,17 +63,34 @@ async def _(args: Message = CommandArg()):
     await add_note.finish(f"已记录：{content}")
 
 @get_notes.handle()
-async def _():
-    # 执行查询 SQL
-    sql = "SELECT * FROM user_notes ORDER BY created_at DESC LIMIT 5"
-    rows = await db.fetch_all(sql)
+async def _(args: Message = CommandArg()):
+    # 参数为上一页最后一条记录的 id，用于键集分页：查询记录 <id>
+    arg = args.extract_plain_text().strip()
+    after = None
+    if arg.isdigit():
+        anchor = await db.fetch_one("SELECT created_at, id FROM user_notes WHERE id = ?", (int(arg),))
+        if not anchor:
+            # 游标对应的记录不存在 (已删除或输入错误)，不要静默回到第一页
+            await get_notes.finish(f"记录 {arg} 不存在，发送「查询记录」从最新一页开始查看")
+            return
+        after = (anchor["created_at"], anchor["id"])
+
+    rows, next_cursor = await db.fetch_page(
+        "user_notes",
+        key=("created_at", "id"),
+        after=after,
+        limit=5,
+        descending=True,
+    )
     
     if not rows:
         await get_notes.finish("暂无记录")
         return
     
-    msg_list = ["📝 最新 5 条记录："]
+    msg_list = ["📝 最新 5 条记录：" if after is None else "📝 更早的记录："]
     for row in rows:
         msg_list.append(f"[{row['created_at']}] {row['content']}")
+    if next_cursor is not None:
+        msg_list.append(f"查看更多请发送：查询记录 {next_cursor[1]}")
     
     await get_notes.finish("\n".join(msg_list))
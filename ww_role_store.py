@@ -0,0 +1,302 @@
+from __future__ import annotations
+
+import hashlib
+import json
+import sys
+from pathlib import Path
+
+from nonebot.log import logger
+
+# 添加当前文件所在目录到 sys.path，确保能找到同级模块
+current_dir = Path(__file__).parent
+if str(current_dir) not in sys.path:
+    sys.path.append(str(current_dir))
+
+try:
+    from ww_db_helper import db
+except ImportError:
+    try:
+        from .ww_db_helper import db
+    except ImportError:
+        from src.plugins.ww_db_helper import db
+
+try:
+    from ww_json import JSONDecodeError, loads
+except ImportError:
+    try:
+        from .ww_json import JSONDecodeError, loads
+    except ImportError:
+        from src.plugins.ww_json import JSONDecodeError, loads
+
+try:
+    from wwSrcoe import send_kuro_request
+except ImportError:
+    try:
+        from .wwSrcoe import send_kuro_request
+    except ImportError:
+        from src.plugins.wwSrcoe import send_kuro_request
+
+if __name__ != "ww_role_store":
+    sys.modules.setdefault("ww_role_store", sys.modules[__name__])
+
+# 鸣潮相关接口
+FIND_DEFAULT_ROLE_URL = "https://api.kurobbs.com/user/role/findUserDefaultRole"
+ROLE_DATA_URL = "https://api.kurobbs.com/aki/roleBox/akiBox/roleData"
+MINGCHAO_GAME_ID = 3
+
+# 除主键 (qq_user_id, game_id, role_id) 外参与内容哈希的列，顺序即写入顺序
+ROLE_COLUMNS = (
+    "bind_uid",
+    "api_user_id",
+    "server_id",
+    "server_name",
+    "role_name",
+    "role_num",
+    "game_level",
+    "role_score",
+    "achievement_count",
+    "action_recover_switch",
+    "active_day",
+    "fashion_collection_percent",
+    "phantom_percent",
+    "point_after",
+    "game_head_url",
+    "head_photo_url",
+    "raw_id",
+    "is_default",
+    "widget_has_pull",
+)
+
+_UPSERT_SQL = (
+    "INSERT INTO user_game_role (qq_user_id, game_id, role_id, "
+    + ", ".join(ROLE_COLUMNS)
+    + ", content_hash) VALUES ("
+    + ", ".join("?" * (len(ROLE_COLUMNS) + 4))
+    + ") ON CONFLICT(qq_user_id, game_id, role_id) DO UPDATE SET "
+    + ", ".join(f"{c}=excluded.{c}" for c in ROLE_COLUMNS)
+    + ", content_hash=excluded.content_hash, updated_at=CURRENT_TIMESTAMP"
+)
+
+_HISTORY_SQL = (
+    "INSERT INTO user_game_role_history (qq_user_id, game_id, role_id, old_hash, new_hash, changed_fields) "
+    "VALUES (?, ?, ?, ?, ?, ?)"
+)
+
+_tables_ready = False
+
+
+async def ensure_role_tables():
+    """创建角色表与变更历史表，并为旧表补上 content_hash 列"""
+    global _tables_ready
+    if _tables_ready:
+        return
+    await db.create_table("""
+        CREATE TABLE IF NOT EXISTS user_game_role (
+            qq_user_id INTEGER NOT NULL,
+            game_id INTEGER NOT NULL,
+            bind_uid TEXT NOT NULL,
+            api_user_id TEXT,
+            server_id TEXT,
+            server_name TEXT,
+            role_id TEXT NOT NULL,
+            role_name TEXT,
+            role_num INTEGER,
+            game_level TEXT,
+            role_score TEXT,
+            achievement_count INTEGER,
+            action_recover_switch INTEGER,
+            active_day INTEGER,
+            fashion_collection_percent REAL,
+            phantom_percent REAL,
+            point_after INTEGER,
+            game_head_url TEXT,
+            head_photo_url TEXT,
+            raw_id TEXT,
+            is_default INTEGER,
+            widget_has_pull INTEGER,
+            updated_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+            content_hash TEXT,
+            PRIMARY KEY (qq_user_id, game_id, role_id)
+        )
+    """)
+    columns = await db.fetch_all("PRAGMA table_info(user_game_role)")
+    if not any(c.get("name") == "content_hash" for c in columns):
+        try:
+            await db.execute_update("ALTER TABLE user_game_role ADD COLUMN content_hash TEXT")
+        except Exception as e:
+            # 并发启动时可能已被其他插件补上
+            if "duplicate column" not in str(e):
+                raise
+    await db.create_table("""
+        CREATE TABLE IF NOT EXISTS user_game_role_history (
+            id INTEGER PRIMARY KEY AUTOINCREMENT,
+            qq_user_id INTEGER NOT NULL,
+            game_id INTEGER NOT NULL,
+            role_id TEXT NOT NULL,
+            old_hash TEXT,
+            new_hash TEXT NOT NULL,
+            changed_fields TEXT,
+            changed_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP
+        )
+    """)
+    await db.create_table("""
+        CREATE INDEX IF NOT EXISTS idx_user_game_role_history_role
+        ON user_game_role_history (qq_user_id, game_id, role_id, changed_at)
+    """)
+    # 用户最近使用记录，后台预同步按活跃度排序
+    await db.create_table("""
+        CREATE TABLE IF NOT EXISTS ww_user_activity (
+            user_id INTEGER PRIMARY KEY,
+            last_active_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+            use_count INTEGER DEFAULT 0
+        )
+    """)
+    await db.create_table("""
+        CREATE INDEX IF NOT EXISTS idx_ww_user_activity_last_active
+        ON ww_user_activity (last_active_at)
+    """)
+    _tables_ready = True
+
+
+def _opt_str(value) -> str | None:
+    return str(value) if value is not None else None
+
+
+def _opt_bool(value) -> int | None:
+    return 1 if value else 0 if value is not None else None
+
+
+def role_values(r: dict, bind_uid: str) -> dict:
+    """将接口返回的单个角色转换为 user_game_role 的列值"""
+    return {
+        "bind_uid": bind_uid,
+        "api_user_id": _opt_str(r.get("userId")),
+        "server_id": _opt_str(r.get("serverId")),
+        "server_name": r.get("serverName"),
+        "role_name": r.get("roleName"),
+        "role_num": r.get("roleNum"),
+        "game_level": r.get("gameLevel"),
+        "role_score": r.get("roleScore"),
+        "achievement_count": r.get("achievementCount"),
+        "action_recover_switch": _opt_bool(r.get("actionRecoverSwitch")),
+        "active_day": r.get("activeDay"),
+        "fashion_collection_percent": r.get("fashionCollectionPercent"),
+        "phantom_percent": r.get("phantomPercent"),
+        "point_after": r.get("pointAfter"),
+        "game_head_url": r.get("gameHeadUrl"),
+        "head_photo_url": r.get("headPhotoUrl"),
+        "raw_id": r.get("id"),
+        "is_default": _opt_bool(r.get("isDefault")),
+        "widget_has_pull": _opt_bool(r.get("widgetHasPull")),
+    }
+
+
+def content_hash(values: dict) -> str:
+    payload = json.dumps([values.get(c) for c in ROLE_COLUMNS], ensure_ascii=False, separators=(",", ":"))
+    return hashlib.blake2b(payload.encode("utf-8"), digest_size=12).hexdigest()
+
+
+def _changed_fields(old: dict | None, new: dict) -> list[str]:
+    if old is None:
+        return list(ROLE_COLUMNS)
+    # SQLite 会按列亲和性转换类型 (如 TEXT 列里的整数)，按字符串比较
+    return [c for c in ROLE_COLUMNS if _opt_str(old.get(c)) != _opt_str(new.get(c))]
+
+
+async def save_roles(qq_user_id: int, bind_uid: str, roles: list[dict], game_id: int = 3) -> int:
+    """
+    保存一次接口响应中的全部角色：
+    - 内容哈希与库中一致的角色直接跳过，不改动 updated_at
+    - 有变化的角色在同一事务中批量 upsert；只有字段确实变化时才写变更历史
+      (哈希算法或存储格式调整导致的哈希变化只更新哈希)
+    :return: 实际写入的角色数
+    """
+    await ensure_role_tables()
+    existing = await db.fetch_all(
+        "SELECT * FROM user_game_role WHERE qq_user_id = ? AND game_id = ?",
+        (qq_user_id, game_id),
+    )
+    existing_by_role = {str(row.get("role_id")): row for row in existing}
+
+    statements: list[tuple[str, tuple]] = []
+    written = 0
+    for r in roles:
+        role_id = _opt_str(r.get("roleId")) or ""
+        values = role_values(r, bind_uid)
+        new_hash = content_hash(values)
+        old = existing_by_role.get(role_id)
+        old_hash = old.get("content_hash") if old else None
+        if old_hash == new_hash:
+            continue
+        changed = _changed_fields(old, values)
+        statements.append((
+            _UPSERT_SQL,
+            (qq_user_id, game_id, role_id, *(values[c] for c in ROLE_COLUMNS), new_hash),
+        ))
+        written += 1
+        if changed:
+            statements.append((
+                _HISTORY_SQL,
+                (qq_user_id, game_id, role_id, old_hash, new_hash, ",".join(changed)),
+            ))
+
+    if not statements:
+        return 0
+    await db.execute_batch(statements)
+    logger.info(f"鸣潮角色数据已更新 qq={qq_user_id} 变更角色 {written}/{len(roles)}")
+    return written
+
+
+async def touch_activity(user_id: int):
+    """记录用户使用了鸣潮相关命令"""
+    await ensure_role_tables()
+    await db.execute_update(
+        "INSERT INTO ww_user_activity (user_id, last_active_at, use_count) VALUES (?, CURRENT_TIMESTAMP, 1) "
+        "ON CONFLICT(user_id) DO UPDATE SET last_active_at=CURRENT_TIMESTAMP, use_count=use_count + 1",
+        (user_id,),
+    )
+
+
+async def get_primary_role(qq_user_id: int, game_id: int = MINGCHAO_GAME_ID) -> dict | None:
+    """获取用户的默认角色 (无默认时取最近更新的)"""
+    return await db.fetch_one(
+        "SELECT role_id, server_id FROM user_game_role "
+        "WHERE qq_user_id = ? AND game_id = ? "
+        "ORDER BY is_default DESC, updated_at DESC LIMIT 1",
+        (qq_user_id, game_id),
+    )
+
+
+async def sync_default_roles(qq_user_id: int, bind_uid: str, refresh: bool = False) -> dict | None:
+    """
+    请求 findUserDefaultRole 并保存鸣潮角色
+    :param refresh: 跳过响应缓存直接请求
+    :return: 接口返回的 JSON，失败时为 None
+    """
+    resp = await send_kuro_request(FIND_DEFAULT_ROLE_URL, "POST", None, {"queryUserId": bind_uid}, refresh=refresh)
+    try:
+        data = loads(resp.content)
+    except JSONDecodeError:
+        return None
+    if not isinstance(data, dict) or not data.get("success"):
+        return data if isinstance(data, dict) else None
+    role_list = (data.get("data") or {}).get("defaultRoleList") or []
+    roles = [r for r in role_list if r.get("gameId") == MINGCHAO_GAME_ID]
+    await save_roles(qq_user_id, bind_uid, roles)
+    return data
+
+
+async def sync_role_data(qq_user_id: int, refresh: bool = False):
+    """
+    请求默认角色的 roleData (卡片数据)，结果由 wwSrcoe 的响应缓存保存
+    :return: httpx.Response，用户没有角色记录时为 None
+    """
+    role = await get_primary_role(qq_user_id)
+    if not role:
+        return None
+    api_data = {
+        "gameId": MINGCHAO_GAME_ID,
+        "roleId": role.get("role_id"),
+        "serverId": role.get("server_id"),
+    }
+    return await send_kuro_request(ROLE_DATA_URL, "POST", None, api_data, refresh=refresh)
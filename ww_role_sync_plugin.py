@@ -0,0 +1,158 @@
+from __future__ import annotations
+
+import asyncio
+import sys
+import time
+from pathlib import Path
+
+from nonebot import get_driver, on_command, require
+from nonebot.log import logger
+from nonebot.permission import SUPERUSER
+
+current_dir = Path(__file__).parent
+if str(current_dir) not in sys.path:
+    sys.path.append(str(current_dir))
+
+try:
+    from ww_db_helper import db
+except ImportError:
+    try:
+        from .ww_db_helper import db
+    except ImportError:
+        from src.plugins.ww_db_helper import db
+
+try:
+    from ww_role_store import ensure_role_tables, sync_default_roles, sync_role_data
+except ImportError:
+    try:
+        from .ww_role_store import ensure_role_tables, sync_default_roles, sync_role_data
+    except ImportError:
+        from src.plugins.ww_role_store import ensure_role_tables, sync_default_roles, sync_role_data
+
+try:
+    from ww_json import JSONDecodeError, loads
+except ImportError:
+    try:
+        from .ww_json import JSONDecodeError, loads
+    except ImportError:
+        from src.plugins.ww_json import JSONDecodeError, loads
+
+require("nonebot_plugin_apscheduler")
+from nonebot_plugin_apscheduler import scheduler
+
+driver = get_driver()
+
+_lock = asyncio.Lock()
+
+
+def _role_data_error(resp) -> str | None:
+    """检查 roleData 响应，成功返回 None，否则返回失败原因"""
+    if resp is None:
+        return "没有角色记录"
+    if not 200 <= resp.status_code < 300:
+        return f"HTTP {resp.status_code}"
+    try:
+        data = loads(resp.content)
+    except JSONDecodeError:
+        return "响应不是 JSON"
+    if not isinstance(data, dict) or not data.get("success"):
+        return f"接口返回失败 {data.get('msg') if isinstance(data, dict) else ''}".strip()
+    return None
+
+
+async def _active_bound_users(active_days: int, limit: int) -> list[dict]:
+    """最近 active_days 天内用过鸣潮命令的已绑定用户，越活跃越靠前"""
+    await ensure_role_tables()
+    exists = await db.fetch_one("SELECT name FROM sqlite_master WHERE type = 'table' AND name = 'user_bind'")
+    if not exists:
+        return []
+    return await db.fetch_all(
+        "SELECT b.user_id, b.game_uid FROM user_bind b "
+        "JOIN ww_user_activity a ON a.user_id = b.user_id "
+        "WHERE a.last_active_at >= datetime('now', ?) "
+        "ORDER BY a.last_active_at DESC, a.use_count DESC LIMIT ?",
+        (f"-{active_days} days", limit),
+    )
+
+
+async def run_role_sync() -> str:
+    """
+    按活跃度为已绑定用户预先刷新 findUserDefaultRole 与 roleData：
+    角色写入 user_game_role，两个接口的响应写入 wwSrcoe 的响应缓存，
+    用户发送 ww查看 / ww卡片 时可直接命中缓存
+    每轮最多发出 ww_role_sync_budget 个请求，请求间按 ww_role_sync_rps 限速
+    """
+    budget = int(getattr(driver.config, "ww_role_sync_budget", 60))
+    rps = float(getattr(driver.config, "ww_role_sync_rps", 0.5))
+    active_days = int(getattr(driver.config, "ww_role_sync_active_days", 7))
+    interval = 1 / rps if rps > 0 else 0.0
+
+    if _lock.locked():
+        return "鸣潮角色预同步正在进行中"
+    async with _lock:
+        started = time.perf_counter()
+        users = await _active_bound_users(active_days, max(budget, 0))
+        used = synced = partial = failed = 0
+
+        async def _request(coro):
+            nonlocal used
+            if used and interval:
+                await asyncio.sleep(interval)
+            used += 1
+            return await coro
+
+        for u in users:
+            if used >= budget:
+                break
+            try:
+                data = await _request(sync_default_roles(u["user_id"], u["game_uid"], refresh=True))
+                if not data or not data.get("success"):
+                    failed += 1
+                    continue
+                if used >= budget:
+                    # 只刷新了默认角色，roleData 留到下一轮
+                    partial += 1
+                    continue
+                error = _role_data_error(await _request(sync_role_data(u["user_id"], refresh=True)))
+                if error is not None:
+                    failed += 1
+                    logger.warning(f"鸣潮角色预同步 roleData 失败 qq={u['user_id']} err={error}")
+                    continue
+                synced += 1
+            except Exception as e:
+                failed += 1
+                logger.warning(f"鸣潮角色预同步失败 qq={u['user_id']} err={e}")
+
+        elapsed = time.perf_counter() - started
+        return (
+            f"鸣潮角色预同步完成：活跃用户 {len(users)} 已同步 {synced} 部分同步 {partial} 失败 {failed} "
+            f"请求 {used}/{budget} 耗时 {elapsed:.1f}s"
+        )
+
+
+@scheduler.scheduled_job(
+    "interval",
+    seconds=int(getattr(driver.config, "ww_role_sync_interval", 1800)),
+    id="ww_role_sync",
+    max_instances=1,
+)
+async def scheduled_role_sync():
+    if not getattr(driver.config, "ww_role_sync_enabled", True):
+        return
+    try:
+        logger.info(await run_role_sync())
+    except Exception as e:
+        logger.warning(f"鸣潮角色预同步失败 err={e}")
+
+
+ww_role_sync = on_command("ww预同步", permission=SUPERUSER, priority=5, block=True)
+
+
+@ww_role_sync.handle()
+async def handle_role_sync():
+    try:
+        report = await run_role_sync()
+    except Exception as e:
+        await ww_role_sync.finish(f"鸣潮角色预同步失败：{e}")
+        return
+    await ww_role_sync.finish(report)
@@ -0,0 +1,123 @@
+from __future__ import annotations
+
+import re
+import sys
+from dataclasses import dataclass
+from typing import Any, Awaitable, Callable
+
+from nonebot.adapters.onebot.v11 import MessageEvent
+
+if __name__ != "ww_router":
+    sys.modules.setdefault("ww_router", sys.modules[__name__])
+
+
+@dataclass(frozen=True)
+class Route:
+    prefix: str
+    handler: Callable[..., Awaitable[Any]]
+    pattern: re.Pattern | None = None
+    event_type: type = MessageEvent
+    to_me: bool = False
+
+    @property
+    def name(self) -> str:
+        return f"{self.handler.__module__.rsplit('.', 1)[-1]}.{self.handler.__name__}"
+
+    def accepts(self, event: MessageEvent, text: str) -> re.Match | bool:
+        if not isinstance(event, self.event_type):
+            return False
+        if self.to_me and not event.is_tome():
+            return False
+        if self.pattern is not None:
+            return self.pattern.match(text) or False
+        return True
+
+
+@dataclass(frozen=True)
+class RouteMatch:
+    route: Route
+    # 去掉首尾空白后的纯文本
+    text: str
+    # 前缀之后的部分 (已去掉首尾空白)
+    args: str
+    match: re.Match | None = None
+
+
+class _Node:
+    __slots__ = ("children", "routes")
+
+    def __init__(self):
+        self.children: dict[str, _Node] = {}
+        self.routes: list[Route] = []
+
+
+class PrefixRouter:
+    """
+    文本命令路由：所有前缀放在一棵 trie 里，每个事件只提取一次纯文本，
+    沿 trie 走到最长前缀为止，再按从长到短的顺序检查候选路由的附加条件 (正则、事件类型、@机器人)
+    单次匹配的耗时只与消息开头的长度有关，与注册的命令数量无关
+    """
+
+    def __init__(self):
+        self._root = _Node()
+        self._routes: list[Route] = []
+        self.stats = {"events": 0, "routed": 0}
+
+    def add(
+        self,
+        prefix: str,
+        handler: Callable[..., Awaitable[Any]],
+        *,
+        pattern: str | re.Pattern | None = None,
+        event_type: type = MessageEvent,
+        to_me: bool = False,
+    ) -> Route:
+        if not prefix:
+            raise ValueError("前缀不能为空")
+        if isinstance(pattern, str):
+            pattern = re.compile(pattern)
+        route = Route(prefix, handler, pattern, event_type, to_me)
+        node = self._root
+        for ch in prefix:
+            node = node.children.setdefault(ch, _Node())
+        node.routes.append(route)
+        self._routes.append(route)
+        return route
+
+    def on(self, prefix: str, **kwargs):
+        """
+        装饰器形式注册，处理函数签名为 handler(bot, event, matcher, route: RouteMatch)
+        结束会话使用 matcher.finish(...)
+        """
+        def decorator(handler):
+            self.add(prefix, handler, **kwargs)
+            return handler
+        return decorator
+
+    def routes(self) -> list[Route]:
+        return list(self._routes)
+
+    def resolve_text(self, event: MessageEvent, text: str) -> RouteMatch | None:
+        candidates: list[Route] = []
+        node = self._root
+        for ch in text:
+            node = node.children.get(ch)
+            if node is None:
+                break
+            candidates.extend(node.routes)
+        for route in reversed(candidates):
+            ok = route.accepts(event, text)
+            if ok:
+                match = ok if isinstance(ok, re.Match) else None
+                return RouteMatch(route, text, text[len(route.prefix):].strip(), match)
+        return None
+
+    def resolve(self, event: MessageEvent) -> RouteMatch | None:
+        self.stats["events"] += 1
+        result = self.resolve_text(event, event.get_plaintext().strip())
+        if result is not None:
+            self.stats["routed"] += 1
+        return result
+
+
+router = PrefixRouter()
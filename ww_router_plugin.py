@@ -0,0 +1,41 @@
+import sys
+from pathlib import Path
+
+from nonebot import on_message
+from nonebot.adapters.onebot.v11 import Bot, MessageEvent
+from nonebot.matcher import Matcher
+from nonebot.rule import Rule
+from nonebot.typing import T_State
+
+current_dir = Path(__file__).parent
+if str(current_dir) not in sys.path:
+    sys.path.append(str(current_dir))
+
+try:
+    from ww_router import router
+except ImportError:
+    try:
+        from .ww_router import router
+    except ImportError:
+        from src.plugins.ww_router import router
+
+_ROUTE_KEY = "_ww_route"
+
+
+async def _route_rule(event: MessageEvent, state: T_State) -> bool:
+    """所有文本命令共用的一条规则：一次 trie 查找，命中的路由放进 state 交给处理器"""
+    match = router.resolve(event)
+    if match is None:
+        return False
+    state[_ROUTE_KEY] = match
+    return True
+
+
+# 统一分发器：替代各插件各自的 on_message + 前缀规则
+ww_dispatcher = on_message(rule=Rule(_route_rule), priority=10, block=True)
+
+
+@ww_dispatcher.handle()
+async def handle_dispatch(bot: Bot, event: MessageEvent, matcher: Matcher, state: T_State):
+    match = state[_ROUTE_KEY]
+    await match.route.handler(bot, event, matcher, match)